@@ -1,11 +1,25 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional
 from fastapi.middleware.cors import CORSMiddleware
-import pickle
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+import cProfile
+import hmac
+import json
 import os
-import re
-import numpy as np
+import random
+import threading
+import time
+import metrics
+from batcher import InferenceBatcher, BatcherFull
+from worker_pool import WorkerPool
+from model_host import ModelHost
+from pipeline import ScoringPipeline, DEFAULT_ML_SCORE, review_text, source_id
+from rules import score_reviews
+from dedup_index import NearDuplicateIndex, review_key
+from reviewer_store import ReviewerStore, parse_review_date, reviewer_key
+from result_cache import ResultCache, fingerprint
+from artifacts import ArtifactError, check_version_name
 
 app = FastAPI()
 
@@ -17,19 +31,133 @@ app.add_middleware(
 )
 
 # LOAD DEEP LEARNING MODEL
-MODEL_PATH = "arc_model.pkl"
-encoder = None
-classifier = None
+# ARC_MODEL_SOURCE: models root (uses CURRENT), a version directory or a legacy .pkl;
+# by default models/ when it has a CURRENT pointer, else arc_model.pkl
+MODEL_SOURCE = os.environ.get("ARC_MODEL_SOURCE") or None
+VERIFY_MODEL = os.environ.get("ARC_VERIFY_MODEL", "1") == "1"
+# /admin/reload requires the X-ARC-Admin-Token header to match; without ARC_ADMIN_TOKEN it is disabled
+ADMIN_TOKEN = os.environ.get("ARC_ADMIN_TOKEN") or None
+# CASCADE: the artifact's hashed n-gram first stage settles easy reviews without the transformer;
+# ARC_CASCADE=0 sends every review through the full model
+CASCADE = os.environ.get("ARC_CASCADE", "1") == "1"
+# EMBEDDING CACHE: ARC_EMBED_CACHE_SIZE entries in memory, optional disk tier in ARC_EMBED_CACHE_DIR
+EMBED_CACHE_SIZE = int(os.environ.get("ARC_EMBED_CACHE_SIZE", "50000"))
+EMBED_CACHE_DIR = os.environ.get("ARC_EMBED_CACHE_DIR") or None
+# ENCODING: cache misses are encoded in length-sorted batches of at most ARC_ENCODE_TOKEN_BUDGET
+# padded tokens (the truncation length comes from the model artifact)
+ENCODE_TOKEN_BUDGET = int(os.environ.get("ARC_ENCODE_TOKEN_BUDGET", "8192"))
 
-if os.path.exists(MODEL_PATH):
-    try:
-        with open(MODEL_PATH, 'rb') as f:
-            bundle = pickle.load(f)
-            encoder = bundle["encoder"]
-            classifier = bundle["classifier"]
-        print("✅ Deep Learning Model (Transformer) Loaded")
-    except Exception as e:
-        print(f"❌ Error loading model: {e}")
+# PROFILING
+# ARC_PROFILE_SAMPLE=0.01 profiles ~1% of /score calls into ARC_PROFILE_DIR/*.prof (view with snakeviz/pstats).
+# Only the request thread is profiled; model time shows up as waiting on the batcher.
+PROFILE_SAMPLE = float(os.environ.get("ARC_PROFILE_SAMPLE", "0"))
+PROFILE_DIR = os.environ.get("ARC_PROFILE_DIR", "profiles")
+# cProfile allows one active profiler per process (enforced from Python 3.12); overlapping samples are skipped
+profile_lock = threading.Lock()
+
+# SERVING MODE
+# "thread": inference runs in this process. "pool": batches go over pipes to ARC_POOL_WORKERS
+# inference processes forked after the model is loaded, so its memory is shared copy-on-write.
+# In pool mode each worker keeps its own embedding cache, and its disk tier in ARC_EMBED_CACHE_DIR/<version>-w<slot>;
+# workers send their stage timings and cache counters back with every batch for /metrics and /cache/stats.
+SERVING_MODE = os.environ.get("ARC_SERVING_MODE", "thread")
+POOL_WORKERS = int(os.environ.get("ARC_POOL_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+POOL_THREADS = int(os.environ.get("ARC_POOL_THREADS", str(max(1, (os.cpu_count() or 1) // POOL_WORKERS))))
+POOL_PIN_CPUS = os.environ.get("ARC_POOL_PIN_CPUS", "0") == "1"
+
+# MICRO-BATCHING
+# Concurrent /score requests are merged into shared batches by the scheduler
+# (one batch in flight per pool worker in pool mode)
+BATCH_MAX_SIZE = int(os.environ.get("ARC_BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("ARC_BATCH_MAX_WAIT_MS", "5"))
+BATCH_MAX_QUEUE = int(os.environ.get("ARC_BATCH_MAX_QUEUE", "256"))
+BATCH_TIMEOUT_S = float(os.environ.get("ARC_BATCH_TIMEOUT_S", "30"))
+
+# NEAR-DUPLICATE INDEX
+# MinHash/LSH over every scored text, bounded to ARC_DEDUP_CAPACITY reviews (0 disables it);
+# snapshotted to ARC_DEDUP_SNAPSHOT every ARC_DEDUP_SNAPSHOT_S seconds and on shutdown
+DEDUP_CAPACITY = int(os.environ.get("ARC_DEDUP_CAPACITY", "100000"))
+DEDUP_SNAPSHOT = os.environ.get("ARC_DEDUP_SNAPSHOT", os.path.join("dedup", "index.npz"))
+DEDUP_SNAPSHOT_S = float(os.environ.get("ARC_DEDUP_SNAPSHOT_S", "300"))
+
+# REVIEWER PROFILES
+# Per-reviewer counts, ratings, verified share and posting bursts behind "Reviewer History";
+# kept in memory and flushed to the SQLite file ARC_REVIEWERS_DB (empty disables the store)
+# every ARC_REVIEWERS_FLUSH_S seconds. Backfill with: python reviewer_store.py reviews.parquet
+REVIEWERS_DB = os.environ.get("ARC_REVIEWERS_DB", os.path.join("reviewers", "reviewers.sqlite"))
+REVIEWERS_FLUSH_S = float(os.environ.get("ARC_REVIEWERS_FLUSH_S", "60"))
+
+# RESULT CACHE
+# Finished results keyed by (review fingerprint, model version), so a review another user just
+# scored is answered without re-running it; ARC_RESULT_CACHE_SIZE=0 disables it
+RESULT_CACHE_SIZE = int(os.environ.get("ARC_RESULT_CACHE_SIZE", "100000"))
+RESULT_CACHE_TTL_S = float(os.environ.get("ARC_RESULT_CACHE_TTL_S", "3600"))
+
+def load_pipeline(version=None):
+    return ScoringPipeline.from_source(MODEL_SOURCE, EMBED_CACHE_SIZE, EMBED_CACHE_DIR, version, VERIFY_MODEL, CASCADE,
+                                      ENCODE_TOKEN_BUDGET)
+
+def start_pool(pipeline):
+    print(f"🧵 Inference pool: {POOL_WORKERS} workers x {POOL_THREADS} threads")
+    return WorkerPool(pipeline.infer, POOL_WORKERS, POOL_THREADS, POOL_PIN_CPUS,
+                      on_start=pipeline.as_worker, on_exit=pipeline.close,
+                      cache_stats=pipeline.embedding_cache.stats)
+
+# The model loads in the background; /ready turns 200 once it is loaded and warmed up
+def identify_model(version=None):
+    return source_id(MODEL_SOURCE, version)
+
+host = ModelHost(load_pipeline, start_pool if SERVING_MODE == "pool" else None, retire_after_s=BATCH_TIMEOUT_S,
+                 identify=identify_model)
+metrics.REGISTRY.add_collector(host.metric_lines)
+dedup = NearDuplicateIndex.load(DEDUP_SNAPSHOT, DEDUP_CAPACITY) if DEDUP_CAPACITY > 0 else None
+if dedup is not None:
+    metrics.REGISTRY.add_collector(dedup.metric_lines)
+reviewers = ReviewerStore(REVIEWERS_DB) if REVIEWERS_DB else None
+if reviewers is not None:
+    metrics.REGISTRY.add_collector(reviewers.metric_lines)
+results_cache = ResultCache(RESULT_CACHE_SIZE, RESULT_CACHE_TTL_S) if RESULT_CACHE_SIZE > 0 else None
+if results_cache is not None:
+    metrics.REGISTRY.add_collector(results_cache.metric_lines)
+batcher = InferenceBatcher(
+    host.infer,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    max_queue=BATCH_MAX_QUEUE,
+    workers=POOL_WORKERS if SERVING_MODE == "pool" else 1,
+)
+
+def run_periodically(fn, interval, stop):
+    while not stop.wait(interval):
+        try:
+            fn()
+        except Exception as e:
+            print(f"⚠️ Periodic {fn.__name__} failed: {e}")
+
+def snapshot_dedup():
+    dedup.save(DEDUP_SNAPSHOT)
+
+persist_stop = threading.Event()
+
+@app.on_event("startup")
+def start_model_load():
+    host.load_in_background()
+    if dedup is not None and DEDUP_SNAPSHOT_S > 0:
+        threading.Thread(target=run_periodically, args=(snapshot_dedup, DEDUP_SNAPSHOT_S, persist_stop),
+                         name="arc-dedup-snapshot", daemon=True).start()
+    if reviewers is not None and REVIEWERS_FLUSH_S > 0:
+        threading.Thread(target=run_periodically, args=(reviewers.flush, REVIEWERS_FLUSH_S, persist_stop),
+                         name="arc-reviewers-flush", daemon=True).start()
+
+@app.on_event("shutdown")
+def shutdown_inference():
+    batcher.stop()
+    host.close()
+    persist_stop.set()
+    if dedup is not None:
+        snapshot_dedup()
+    if reviewers is not None:
+        reviewers.close()
 
 # DATA MODELS
 class ReviewIn(BaseModel):
@@ -38,87 +166,199 @@ class ReviewIn(BaseModel):
     verified_purchase: bool = False
     image_count: int = 0
     author_name: Optional[str] = "Unknown"
+    review_id: Optional[str] = None
+    reviewer_id: Optional[str] = None
+    rating: Optional[float] = None
+    review_date: Optional[str] = None
 
 class ScoreReq(BaseModel):
     reviews: List[ReviewIn]
 
-def is_suspicious_name(name):
-    if not name: return True
-    name = name.lower().strip()
-    if "amazon customer" in name: return True
-    if re.match(r"user\d{4,}", name): return True
-    if re.match(r"^[a-z0-9]{8,}$", name) and not " " in name: return True
-    return False
+class LookupReq(BaseModel):
+    fingerprints: List[str]
+
+@app.middleware("http")
+async def stamp_request_start(request: Request, call_next):
+    request.state.t0 = time.perf_counter()
+    return await call_next(request)
 
 @app.post("/score")
-def score(req: ScoreReq):
+def score(req: ScoreReq, request: Request):
+    # Body read + validation + threadpool dispatch, everything before this handler runs
+    metrics.STAGE_SECONDS.observe(time.perf_counter() - request.state.t0, stage="parse")
+    metrics.REQUEST_REVIEWS.observe(len(req.reviews))
     if not req.reviews: return {"scores": []}
-    
-    texts = [(r.review_title or "") + " " + (r.review_body or "") for r in req.reviews]
-    ml_scores = [0.5] * len(texts)
+
+    profiler = None
+    if PROFILE_SAMPLE and random.random() < PROFILE_SAMPLE and profile_lock.acquire(blocking=False):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool (e.g. a debugger) is active; score without profiling
+            profiler = None
+            profile_lock.release()
+    try:
+        results, _ = score_chunk(req.reviews)
+    except BatcherFull as e:
+        metrics.SHED.inc()
+        raise HTTPException(status_code=503, detail=str(e))
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profile_lock.release()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profiler.dump_stats(os.path.join(PROFILE_DIR, f"score-{time.time_ns()}.prof"))
+
+    with metrics.stage("serialize"):
+        return JSONResponse({"scores": results})
+
+def score_chunk(reviews):
+    """Scores for `reviews`, reusing results this model version already produced for the same fingerprints.
+
+    Returns (results, model version); the version is None if any ML score fell back to the default.
+    """
+    if results_cache is None:
+        return score_fresh(reviews)
+    fps = [fingerprint(r) for r in reviews]
+    version = host.version
+    results = results_cache.get_many(fps, version) if version else [None] * len(reviews)
+    todo = [i for i, cached in enumerate(results) if cached is None]
+    if todo:
+        fresh, scored_with = score_fresh([reviews[i] for i in todo])
+        # Fallback scores (model not ready / inference failed) are never cached
+        if scored_with is not None:
+            results_cache.put_many([fps[i] for i in todo], scored_with, fresh)
+        for i, result in zip(todo, fresh):
+            results[i] = result
+        version = scored_with
+    return results, version
+
+def score_fresh(reviews):
+    """Runs the full pipeline; returns (results, model version or None if the ML score fell back)."""
+    with metrics.stage("text"):
+        texts = [review_text(r) for r in reviews]
+    ml_scores = [DEFAULT_ML_SCORE] * len(texts)
+    scored_with = None
     
     # 1. RUN DEEP LEARNING MODEL
-    if encoder and classifier:
+    if host.ready:
         try:
-            # Encode text to vectors (Semantic Search)
-            embeddings = encoder.encode(texts)
-            # Predict
-            probs = classifier.predict_proba(embeddings)[:, 1]
-            ml_scores = probs
+            # Encode + predict, batched together with other in-flight requests
+            version = host.version
+            ml_scores = batcher.infer(texts, timeout=BATCH_TIMEOUT_S)
+            # A hot-swap mid-batch leaves it unclear which model answered; don't cache that
+            scored_with = version if host.version == version else None
+        except BatcherFull:
+            raise
         except Exception as e:
+            metrics.FALLBACKS.inc(len(texts))
             print(f"Inference Error: {e}")
             pass
+    else:
+        metrics.FALLBACKS.inc(len(texts))
+
+    # 2. NEAR-DUPLICATES among everything scored so far (template campaigns)
+    dup_counts = None
+    keys = [review_key(r, t) for r, t in zip(reviews, texts)]
+    if dedup is not None:
+        with metrics.stage("dedup"):
+            dup_counts = dedup.query_and_add(texts, keys)
+
+    # 3. REVIEWER PROFILES: count this batch in, then read back each reviewer's history
+    profiles = None
+    if reviewers is not None:
+        with metrics.stage("profiles"):
+            who = [reviewer_key(r.reviewer_id, r.author_name) for r in reviews]
+            dates = [parse_review_date(r.review_date) for r in reviews]
+            reviewers.update(
+                who, keys,
+                [float("nan") if r.rating is None else r.rating for r in reviews],
+                [len(r.review_body or "") for r in reviews],
+                [r.verified_purchase for r in reviews],
+                dates,
+            )
+            profiles = reviewers.lookup(who, dates)
+
+    # 4. SYMBOLIC LAYER (metadata, semantic bands, behavior, near-duplicates, trust ceiling)
+    with metrics.stage("rules"):
+        return score_reviews(reviews, ml_scores, dup_counts, profiles), scored_with
 
-    results = []
-
-    for i, r in enumerate(req.reviews):
-        score = 50 
-        reasons = []
-
-        # --- THE HYBRID FORMULA ---
-        
-        # 1. METADATA LAYER
-        if r.verified_purchase: 
-            score += 25
-            reasons.append({"icon": "✅", "text": "Verified Purchase"})
-        
-        if r.image_count > 0: 
-            score += 15
-            reasons.append({"icon": "📸", "text": "Media verified"})
-
-        # 2. SEMANTIC LAYER (The ML Score)
-        ml_conf = ml_scores[i]
-        
-        # High Confidence Real
-        if ml_conf > 0.8: 
-            score += 15
-            reasons.append({"icon": "🧠", "text": "Writing style analysis: Authentic"})
-        # High Confidence Fake
-        elif ml_conf < 0.3: 
-            score -= 25
-            reasons.append({"icon": "🤖", "text": "Writing style analysis: Generic/AI"})
-
-        # 3. BEHAVIORAL LAYER (Username)
-        if is_suspicious_name(r.author_name): 
-            score -= 15
-            history = "Suspicious Profile"
-        else:
-            history = "Standard Profile"
-
-        # 4. CAP SCORE
-        final_score = int(max(0, min(100, score)))
-        
-        # Labeling
-        if final_score < 40: label = "Likely Fake"
-        elif final_score < 60: label = "Low Confidence"
-        elif final_score >= 90: label = "Highly Authentic"
-        else: label = "Feels Genuine"
-
-        results.append({
-            "total": final_score,
-            "label": label,
-            "reasons": reasons,
-            "history": history
-        })
-
-    return {"scores": results}
+# STREAMING
+# Sub-batches start small so the first badges arrive quickly, then double up to the batch size
+STREAM_FIRST_CHUNK = int(os.environ.get("ARC_STREAM_FIRST_CHUNK", "4"))
+
+def stream_chunks(n):
+    start, size = 0, STREAM_FIRST_CHUNK
+    while start < n:
+        yield start, min(start + size, n)
+        start += size
+        size = min(size * 2, BATCH_MAX_SIZE)
+
+@app.post("/score/stream")
+def score_stream(req: ScoreReq):
+    """NDJSON: one {"results": [...], "version": ...} line per scored sub-batch, each result keyed by index.
+
+    `version` is the model that produced the line (null for default-score fallbacks); clients cache
+    results by their `fingerprint` only when it is set.
+    """
+    def generate():
+        for start, end in stream_chunks(len(req.reviews)):
+            chunk = req.reviews[start:end]
+            try:
+                scores, version = score_chunk(chunk)
+            except BatcherFull as e:
+                yield json.dumps({"error": str(e), "pending": list(range(start, len(req.reviews)))}) + "\n"
+                return
+            for offset, (r, s) in enumerate(zip(chunk, scores)):
+                s["index"] = start + offset
+                s["fingerprint"] = fingerprint(r)
+                if r.review_id:
+                    s["review_id"] = r.review_id
+            yield json.dumps({"results": scores, "version": version}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+@app.post("/score/lookup")
+def score_lookup(req: LookupReq):
+    """Cached results by fingerprint for the serving model; clients send bodies only for the misses."""
+    version = host.version
+    found = {}
+    if results_cache is not None and version:
+        for fp, result in zip(req.fingerprints, results_cache.get_many(req.fingerprints, version)):
+            if result is not None:
+                result["fingerprint"] = fp
+                found[fp] = result
+    return {"version": version, "results": found}
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+def cache_stats():
+    return host.cache_stats()
+
+@app.get("/ready")
+def ready():
+    body = {"ready": host.ready, "version": host.version, "loading": host.loading, "error": host.error}
+    return JSONResponse(body, status_code=200 if host.ready else 503)
+
+@app.post("/admin/reload")
+def reload_model(request: Request, version: Optional[str] = None):
+    """Load `version` (default: whatever CURRENT points to) and hot-swap it in once warmed up."""
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=403, detail="admin endpoints are disabled; set ARC_ADMIN_TOKEN")
+    if not hmac.compare_digest(request.headers.get("x-arc-admin-token", "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="bad admin token")
+    if version is not None:
+        try:
+            check_version_name(version)
+        except ArtifactError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    if host.loading:
+        raise HTTPException(status_code=409, detail="a model load is already in progress")
+    if host.is_active(version):
+        return JSONResponse({"loaded": version or "CURRENT", "serving": host.version, "detail": "already loaded"})
+    host.load_in_background(version)
+    return JSONResponse({"loading": version or "CURRENT", "serving": host.version}, status_code=202)
@@ -0,0 +1,159 @@
+"""Versioned model artifacts: a directory per model version instead of one pickle.
+
+    models/
+      CURRENT                   -> name of the active version
+      20261017-0553-ab12cd34/
+        manifest.json           format, version, metadata, sha256 of every file
+        encoder/                SentenceTransformer.save() output (native weights)
+        classifier/             CompiledGBC arrays (.npy, memory-mapped at load)
+        first_stage/            optional hashed n-gram cascade stage (see cascade.py)
+        projection/             optional embedding compression the classifier was fit on (see projection.py)
+
+Versions are written to a temp directory and renamed into place, and CURRENT is
+replaced atomically, so a reader never sees a half-written model.
+"""
+from __future__ import annotations
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from typing import Dict, Optional, Tuple
+
+from cascade import FirstStage
+from projection import Projector
+from tree_predictor import CompiledGBC
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+CURRENT = "CURRENT"
+
+
+class ArtifactError(Exception):
+    """The artifact is missing, incomplete or fails its hash check."""
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _hash_tree(root: str) -> Dict[str, str]:
+    out = {}
+    for dirpath, _, files in os.walk(root):
+        for name in sorted(files):
+            full = os.path.join(dirpath, name)
+            rel = os.path.relpath(full, root)
+            if rel != MANIFEST:
+                out[rel] = _sha256(full)
+    return out
+
+
+def write_artifact(root: str, encoder, classifier: CompiledGBC, metadata: Optional[Dict] = None,
+                   make_current: bool = True, first_stage: Optional[FirstStage] = None,
+                   projector: Optional[Projector] = None) -> str:
+    """Save encoder + compiled classifier (+ first stage, projector) as a new version under `root`; returns its path."""
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".incoming-", dir=root)
+    try:
+        encoder.save(os.path.join(tmp, "encoder"))
+        classifier.save(os.path.join(tmp, "classifier"))
+        if first_stage is not None:
+            first_stage.save(os.path.join(tmp, "first_stage"))
+        if projector is not None:
+            projector.save(os.path.join(tmp, "projection"))
+        files = _hash_tree(tmp)
+        digest = hashlib.sha256("".join(f"{k}:{v}" for k, v in sorted(files.items())).encode()).hexdigest()
+        version = datetime.datetime.now().strftime("%Y%m%d-%H%M%S") + "-" + digest[:8]
+        manifest = {
+            "format": FORMAT_VERSION,
+            "version": version,
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "encoder": {"path": "encoder"},
+            "classifier": {"kind": "compiled_gbc", "path": "classifier"},
+            "first_stage": {"kind": "hashed_ngram_linear", "path": "first_stage"} if first_stage is not None else None,
+            "projection": {"kind": projector.method, "path": "projection"} if projector is not None else None,
+            "metadata": metadata or {},
+            "files": files,
+        }
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        final = os.path.join(root, version)
+        os.rename(tmp, final)
+    except Exception:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    if make_current:
+        set_current(root, version)
+    return final
+
+
+def check_version_name(version: str) -> str:
+    """`version` must name a directory directly under the models root, nothing that walks out of it."""
+    if (not version or version in (".", "..") or os.sep in version
+            or (os.altsep and os.altsep in version) or os.path.basename(version) != version):
+        raise ArtifactError(f"Invalid model version name {version!r}")
+    return version
+
+
+def set_current(root: str, version: str) -> None:
+    check_version_name(version)
+    if not os.path.exists(os.path.join(root, version, MANIFEST)):
+        raise ArtifactError(f"No model version {version!r} in {root}")
+    tmp = os.path.join(root, f".{CURRENT}.tmp")
+    with open(tmp, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(root, CURRENT))
+
+
+def resolve(root: str, version: Optional[str] = None) -> str:
+    """Path of `version` (default: CURRENT) under `root`."""
+    if version is None:
+        pointer = os.path.join(root, CURRENT)
+        if not os.path.exists(pointer):
+            raise ArtifactError(f"No {CURRENT} pointer in {root}")
+        with open(pointer) as f:
+            version = f.read().strip()
+    path = os.path.join(root, check_version_name(version))
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        raise ArtifactError(f"No model version {version!r} in {root}")
+    return path
+
+
+def read_manifest(path: str) -> Dict:
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_VERSION:
+        raise ArtifactError(f"Unsupported artifact format {manifest.get('format')!r} in {path}")
+    return manifest
+
+
+def verify(path: str, manifest: Dict) -> None:
+    for rel, expected in manifest["files"].items():
+        full = os.path.join(path, rel)
+        if not os.path.exists(full):
+            raise ArtifactError(f"{rel} missing from {path}")
+        if _sha256(full) != expected:
+            raise ArtifactError(f"{rel} in {path} does not match its manifest hash")
+
+
+def load_artifact(path: str, check_hashes: bool = True
+                  ) -> Tuple[object, CompiledGBC, Optional[FirstStage], Optional[Projector], Dict]:
+    """Returns (encoder, classifier, first_stage or None, projector or None, manifest) for the version directory `path`."""
+    manifest = read_manifest(path)
+    if check_hashes:
+        verify(path, manifest)
+    from sentence_transformers import SentenceTransformer
+    encoder = SentenceTransformer(os.path.join(path, manifest["encoder"]["path"]))
+    classifier = CompiledGBC.load(os.path.join(path, manifest["classifier"]["path"]))
+    first_stage = None
+    if manifest.get("first_stage"):
+        first_stage = FirstStage.load(os.path.join(path, manifest["first_stage"]["path"]))
+    projector = None
+    if manifest.get("projection"):
+        projector = Projector.load(os.path.join(path, manifest["projection"]["path"]))
+    return encoder, classifier, first_stage, projector, manifest
@@ -14,3 +14,138 @@ chrome.runtime.onMessage.addListener((msg, sender, sendResponse) => {
     return true; // Async wait
   }
 });
+
+// --- RESULT CACHE ---
+// Results are kept in chrome.storage.local by review fingerprint, tagged with the model version
+// that produced them; a new server version makes every older entry stale.
+const CACHE_PREFIX = "arc:r:";
+const CACHE_VERSION_KEY = "arc:version";
+const CACHE_TTL_MS = 24 * 3600 * 1000;
+const CACHE_MAX_ENTRIES = 5000;
+let writesSincePrune = 0;
+
+// Must match result_cache.fingerprint() on the server
+// (a content hash that includes the review id, never the id alone: the server cache is shared)
+async function fingerprintReview(r) {
+  const parts = [
+    r.review_id || "", r.review_title || "", r.review_body || "", r.author_name || "",
+    r.verified_purchase ? "1" : "0", String(r.image_count || 0),
+    r.reviewer_id || "", r.rating == null ? "" : Number(r.rating).toFixed(1), r.review_date || ""
+  ];
+  const digest = await crypto.subtle.digest("SHA-256", new TextEncoder().encode(parts.join("\u001f")));
+  return "sha256:" + Array.from(new Uint8Array(digest).slice(0, 16), b => b.toString(16).padStart(2, "0")).join("");
+}
+
+async function readCache(fingerprints) {
+  const stored = await chrome.storage.local.get([CACHE_VERSION_KEY, ...fingerprints.map(fp => CACHE_PREFIX + fp)]);
+  const now = Date.now();
+  return fingerprints.map(fp => {
+    const e = stored[CACHE_PREFIX + fp];
+    return e && e.v === stored[CACHE_VERSION_KEY] && now - e.t < CACHE_TTL_MS ? e.r : null;
+  });
+}
+
+async function writeCache(version, results) {
+  if (!version || results.length === 0) return;
+  const now = Date.now();
+  const items = { [CACHE_VERSION_KEY]: version };
+  results.forEach(r => {
+    const { index, ...result } = r;
+    items[CACHE_PREFIX + r.fingerprint] = { v: version, t: now, r: result };
+  });
+  await chrome.storage.local.set(items);
+  writesSincePrune += results.length;
+  if (writesSincePrune > 500) {
+    writesSincePrune = 0;
+    pruneCache();
+  }
+}
+
+// Drop stale entries, then the oldest ones beyond CACHE_MAX_ENTRIES
+async function pruneCache() {
+  const all = await chrome.storage.local.get(null);
+  const now = Date.now();
+  const entries = Object.entries(all).filter(([k]) => k.startsWith(CACHE_PREFIX));
+  const stale = entries.filter(([, e]) => e.v !== all[CACHE_VERSION_KEY] || now - e.t >= CACHE_TTL_MS);
+  const fresh = entries.filter(e => !stale.includes(e)).sort((a, b) => a[1].t - b[1].t);
+  const drop = stale.concat(fresh.slice(0, Math.max(0, fresh.length - CACHE_MAX_ENTRIES)));
+  if (drop.length) await chrome.storage.local.remove(drop.map(([k]) => k));
+}
+
+// Streaming variant: results are forwarded to the tab as each NDJSON line arrives.
+// Delta protocol: reviews in the local cache need no request, then the server is asked by
+// fingerprint only (/score/lookup), and only the remaining bodies go to /score/stream.
+chrome.runtime.onConnect.addListener(port => {
+  if (port.name !== "ARC_STREAM") return;
+
+  port.onMessage.addListener(async msg => {
+    if (msg.type !== "ARC_STREAM_SCORES") return;
+    try {
+      const reviews = msg.payload.reviews;
+      const fingerprints = await Promise.all(reviews.map(fingerprintReview));
+
+      // 1. Local cache
+      const local = await readCache(fingerprints);
+      const localHits = [];
+      local.forEach((r, i) => { if (r) localHits.push({ ...r, index: i }); });
+      if (localHits.length) port.postMessage({ type: "chunk", body: { results: localHits } });
+      let pending = reviews.map((_, i) => i).filter(i => !local[i]);
+
+      // 2. Server result cache, fingerprints only (an older server without /score/lookup just misses)
+      if (pending.length) {
+        try {
+          const res = await fetch(`${ARC_API}/score/lookup`, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ fingerprints: pending.map(i => fingerprints[i]) })
+          });
+          if (res.ok) {
+            const lookup = await res.json();
+            const found = pending.filter(i => lookup.results[fingerprints[i]])
+              .map(i => ({ ...lookup.results[fingerprints[i]], index: i }));
+            if (found.length) port.postMessage({ type: "chunk", body: { results: found } });
+            writeCache(lookup.version, found);
+            pending = pending.filter(i => !lookup.results[fingerprints[i]]);
+          }
+        } catch (err) { /* fall through and send every pending body */ }
+      }
+      if (!pending.length) {
+        port.postMessage({ type: "done" });
+        return;
+      }
+
+      // 3. Bodies for the misses only; indexes in the stream refer to this subset
+      const res = await fetch(`${ARC_API}/score/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ reviews: pending.map(i => reviews[i]) })
+      });
+      if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+
+      const forward = line => {
+        const body = JSON.parse(line);
+        if (body.results) {
+          body.results.forEach(r => { r.index = pending[r.index]; });
+          writeCache(body.version, body.results);
+        }
+        if (body.pending) body.pending = body.pending.map(i => pending[i]);
+        port.postMessage({ type: "chunk", body });
+      };
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffered = "";
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffered += decoder.decode(value, { stream: true });
+        const lines = buffered.split("\n");
+        buffered = lines.pop(); // keep the partial line for the next read
+        lines.filter(l => l.trim()).forEach(forward);
+      }
+      if (buffered.trim()) forward(buffered);
+      port.postMessage({ type: "done" });
+    } catch (err) {
+      port.postMessage({ type: "error", error: err.toString() });
+    }
+  });
+});
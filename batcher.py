@@ -0,0 +1,114 @@
+"""Cross-request dynamic micro-batching for transformer inference.
+
+FastAPI runs each sync `/score` call on its own threadpool thread. Instead of
+every thread calling the encoder with its own small batch, requests are queued
+here and a single scheduler thread merges them into shared batches bounded by
+`max_batch_size` texts and `max_wait_ms` of extra latency. With `workers > 1`
+several scheduler threads each keep one batch in flight, which is how batches
+are fanned out to a multi-process WorkerPool.
+"""
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class BatcherFull(Exception):
+    """Raised when the pending queue is full; callers should shed load (HTTP 503)."""
+
+
+class InferenceBatcher:
+    def __init__(
+        self,
+        infer_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        max_queue: int = 256,
+        workers: int = 1,
+    ):
+        self.infer_fn = infer_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[Tuple[List[str], Future]]" = queue.Queue(maxsize=max_queue)
+        self._carry: Optional[Tuple[List[str], Future]] = None
+        self._collect_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"arc-batcher-{i}", daemon=True) for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        """Queue `texts` for inference; the future resolves to one score per text."""
+        fut: Future = Future()
+        if not texts:
+            fut.set_result(np.zeros(0))
+            return fut
+        try:
+            self._queue.put_nowait((list(texts), fut))
+        except queue.Full:
+            raise BatcherFull(f"inference queue full ({self._queue.maxsize} pending requests)")
+        return fut
+
+    def infer(self, texts: Sequence[str], timeout: Optional[float] = None) -> np.ndarray:
+        return self.submit(texts).result(timeout=timeout)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+
+    def _next(self, timeout: Optional[float]) -> Optional[Tuple[List[str], Future]]:
+        if self._carry is not None:
+            item, self._carry = self._carry, None
+            return item
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _collect(self) -> List[Tuple[List[str], Future]]:
+        first = self._next(timeout=0.1)
+        if first is None:
+            return []
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            item = self._next(timeout=remaining)
+            if item is None:
+                break
+            # A request is never split; if it doesn't fit, it opens the next batch
+            if size + len(item[0]) > self.max_batch_size:
+                self._carry = item
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            # Batches are formed one at a time; only inference runs concurrently
+            with self._collect_lock:
+                batch = self._collect()
+            if not batch:
+                continue
+            texts = [t for item_texts, _ in batch for t in item_texts]
+            try:
+                scores = np.asarray(self.infer_fn(texts))
+            except Exception as e:
+                for _, fut in batch:
+                    fut.set_exception(e)
+                continue
+            offset = 0
+            for item_texts, fut in batch:
+                fut.set_result(scores[offset:offset + len(item_texts)])
+                offset += len(item_texts)
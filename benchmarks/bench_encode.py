@@ -0,0 +1,88 @@
+"""Padding waste and throughput of length-bucketed encoding vs plain fixed-size batches.
+
+    python benchmarks/bench_encode.py --texts-from embedding_store/dataset.parquet --n 4000 --out bench/encode.json
+
+Runs the same texts through `encoder.encode(texts, batch_size=32)` (what training and serving did
+before) and through BucketedEncoder, checks the embeddings agree, and reports texts/s and the
+share of padded tokens for both. Use --texts-from with the training snapshot to measure on the
+real length distribution; without it the synthetic payload mix is used.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import time
+
+import numpy as np
+
+from common import ROOT, peak_rss_mb, write_results
+from payloads import load_real_texts, make_text
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--texts-from", help="Parquet with real texts (e.g. embedding_store/dataset.parquet)")
+    ap.add_argument("--n", type=int, default=2000, help="texts to encode")
+    ap.add_argument("--batch-size", type=int, default=32, help="fixed batch size of the baseline")
+    ap.add_argument("--token-budgets", default="4096,8192,16384")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write JSON results here")
+    args = ap.parse_args()
+
+    os.chdir(ROOT)
+    from sentence_transformers import SentenceTransformer
+    from bucketed_encoder import BucketedEncoder, padding_stats, plan_batches
+    from train_model import ENCODER_NAME
+
+    rng = random.Random(args.seed)
+    real = load_real_texts(args.texts_from, limit=args.n)
+    texts = real[:args.n] if len(real) >= args.n else [make_text(rng, real) for _ in range(args.n)]
+    encoder = SentenceTransformer(ENCODER_NAME)
+    encoder.encode(texts[:64])  # warm
+
+    bucketed = BucketedEncoder(encoder)
+    lengths = bucketed.token_lengths(texts)
+    print(f"📏 {len(texts)} texts, tokens p50 {np.percentile(lengths, 50):.0f} / p95 {np.percentile(lengths, 95):.0f} "
+          f"/ max {lengths.max()}")
+
+    # Baseline: fixed-size batches in arrival order (encode() sorts within the call by characters)
+    t0 = time.perf_counter()
+    baseline = np.asarray(encoder.encode(texts, batch_size=args.batch_size, show_progress_bar=False))
+    base_s = time.perf_counter() - t0
+    order = np.argsort([-len(t) for t in texts], kind="stable")
+    fixed = [order[i:i + args.batch_size] for i in range(0, len(order), args.batch_size)]
+    real_tokens, padded = padding_stats(lengths, fixed)
+    results = {
+        "n_texts": len(texts),
+        "token_p50": float(np.percentile(lengths, 50)),
+        "token_p95": float(np.percentile(lengths, 95)),
+        "baseline": {"batch_size": args.batch_size, "seconds": base_s, "texts_per_s": len(texts) / base_s,
+                     "padding_share": 1 - real_tokens / padded},
+        "bucketed": {},
+    }
+    print(f"   fixed batch {args.batch_size:>5}: {len(texts) / base_s:8.1f} texts/s, "
+          f"{1 - real_tokens / padded:.1%} padding")
+
+    for budget in [int(b) for b in args.token_budgets.split(",")]:
+        bucketed.token_budget = budget
+        t0 = time.perf_counter()
+        out = bucketed.encode(texts)
+        secs = time.perf_counter() - t0
+        real_tokens, padded = padding_stats(lengths, plan_batches(lengths, budget))
+        max_diff = float(np.abs(out - baseline).max())
+        results["bucketed"][str(budget)] = {
+            "seconds": secs,
+            "texts_per_s": len(texts) / secs,
+            "speedup": base_s / secs,
+            "padding_share": 1 - real_tokens / padded,
+            "max_abs_diff": max_diff,
+        }
+        print(f"   budget {budget:>9}: {len(texts) / secs:8.1f} texts/s, {1 - real_tokens / padded:.1%} padding, "
+              f"x{base_s / secs:.2f} (max diff {max_diff:.1e})")
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    write_results(args.out, "encode", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Micro-benchmarks for each /score stage in isolation: first_stage, encode, predict_proba, rules.
+
+    python benchmarks/bench_micro.py --batch-sizes 1,16,64,256 --out bench/micro.json
+
+encode and predict_proba need a trained model (models/ or arc_model.pkl), first_stage an
+artifact with a cascade first stage; the rule layer is always measured.
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict
+
+import numpy as np
+
+from common import ROOT, latency_stats, peak_rss_mb, write_results
+from payloads import load_real_texts, make_payload
+
+
+def measure(fn: Callable[[], object], repeats: int, n_items: int) -> Dict:
+    fn()  # warm
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    stats = latency_stats(times)
+    stats["items_per_s"] = n_items / float(np.median(times))
+    return stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--batch-sizes", default="1,16,64,256")
+    ap.add_argument("--repeats", type=int, default=20)
+    ap.add_argument("--texts-from", help="Parquet with real texts (e.g. embedding_store/dataset.parquet)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write JSON results here")
+    args = ap.parse_args()
+
+    os.chdir(ROOT)
+    from pipeline import ScoringPipeline, review_text
+    from rules import score_reviews
+
+    pipeline = ScoringPipeline.from_source()
+    rng = random.Random(args.seed)
+    real = load_real_texts(args.texts_from)
+    results: Dict[str, Dict] = {"first_stage": {}, "encode": {}, "predict_proba": {}, "rules": {}}
+
+    for bs in [int(b) for b in args.batch_sizes.split(",")]:
+        reviews = [SimpleNamespace(**r) for r in make_payload(bs, rng, real)["reviews"]]
+        texts = [review_text(r) for r in reviews]
+        ml = np.random.default_rng(args.seed).random(bs)
+
+        if pipeline is not None and pipeline.first_stage is not None:
+            results["first_stage"][str(bs)] = measure(lambda: pipeline.first_stage.predict_proba(texts), args.repeats, bs)
+        if pipeline is not None:
+            # Past the embedding cache (it would turn repeats into hits), through the bucketed encoder
+            results["encode"][str(bs)] = measure(lambda: pipeline.batch_encoder.encode(texts), args.repeats, bs)
+            # Cached form (compressed codes when the artifact has a projector) through to the classifier
+            vecs = pipeline.compress(pipeline.batch_encoder.encode(texts))
+            results["predict_proba"][str(bs)] = measure(
+                lambda: pipeline.classifier.predict_proba(pipeline.features(vecs)), args.repeats, bs)
+        results["rules"][str(bs)] = measure(lambda: score_reviews(reviews, ml), args.repeats, bs)
+
+        line = f"batch {bs:>4}:"
+        for stage in ("first_stage", "encode", "predict_proba", "rules"):
+            if str(bs) in results[stage]:
+                line += f" {stage} {results[stage][str(bs)]['p50_ms']:8.2f} ms |"
+        print(line.rstrip(" |"))
+
+    if pipeline is None:
+        print("⚠️ No model found; only the rule layer was measured")
+    results["peak_rss_mb"] = peak_rss_mb()
+    write_results(args.out, "micro", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Load test for /score: throughput and latency percentiles across concurrency and batch size.
+
+    python benchmarks/bench_service.py --mode inproc --out bench/service.json
+    python benchmarks/bench_service.py --mode http --concurrency 1,8,32 --batch-sizes 10,50
+
+`inproc` imports app.py and calls the scoring path directly from a thread pool
+(validation + batcher + model + rules, no HTTP). `http` starts uvicorn on a
+local port and drives it with real requests; peak RSS is then the server's.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from common import ROOT, latency_stats, peak_rss_mb, write_results
+from payloads import load_real_texts, make_payload
+
+
+def inproc_client() -> Callable[[Dict], None]:
+    os.chdir(ROOT)  # app.py resolves model paths relative to the repo root
+    import app
+    app.host.load()  # no ASGI startup event in-process, so load synchronously
+
+    def call(payload: Dict) -> None:
+        req = app.ScoreReq(**payload)
+        json.dumps({"scores": app.score_chunk(req.reviews)[0]}, ensure_ascii=False)
+    return call
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port: int, timeout: float = 300.0) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/ready", timeout=1).read()
+            return proc
+        except urllib.error.HTTPError as e:
+            state = json.loads(e.read() or b"{}")
+            if not state.get("loading") and state.get("error"):
+                print(f"⚠️ Server has no model ({state['error']}); measuring the fallback path")
+                return proc
+        except OSError:
+            if proc.poll() is not None:
+                raise RuntimeError("uvicorn exited during startup")
+        time.sleep(0.5)
+    proc.kill()
+    raise RuntimeError("uvicorn did not become ready in time")
+
+
+def http_client(port: int) -> Callable[[Dict], None]:
+    url = f"http://127.0.0.1:{port}/score"
+
+    def call(payload: Dict) -> None:
+        req = urllib.request.Request(url, data=json.dumps(payload).encode(),
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            resp.read()
+    return call
+
+
+def run_config(call: Callable[[Dict], None], payloads: List[Dict], concurrency: int) -> Dict:
+    def one(p: Dict) -> Optional[float]:
+        # Latency, or None on error; counted on the main thread, not shared across client threads
+        t0 = time.perf_counter()
+        try:
+            call(p)
+        except Exception:
+            return None
+        return time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(one, payloads))
+    wall = time.perf_counter() - t0
+    latencies = [s for s in outcomes if s is not None]
+    errors = len(outcomes) - len(latencies)
+    reviews = sum(len(p["reviews"]) for p in payloads)
+    return {
+        "requests": len(payloads),
+        "errors": errors,
+        "wall_s": wall,
+        "requests_per_s": len(payloads) / wall,
+        "reviews_per_s": reviews / wall,
+        "latency": latency_stats(latencies),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--mode", choices=["inproc", "http"], default="inproc")
+    ap.add_argument("--concurrency", default="1,4,16")
+    ap.add_argument("--batch-sizes", default="1,10,50")
+    ap.add_argument("--requests", type=int, default=200, help="requests per configuration")
+    ap.add_argument("--texts-from", help="Parquet with real texts (e.g. embedding_store/dataset.parquet)")
+    ap.add_argument("--cache-size", type=int,
+                    help="ARC_EMBED_CACHE_SIZE for the service (0 measures cold encodes every time)")
+    ap.add_argument("--result-cache-size", type=int, default=0,
+                    help="ARC_RESULT_CACHE_SIZE for the service (default 0: repeated payloads are re-scored)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", help="write JSON results here")
+    args = ap.parse_args()
+
+    if args.cache_size is not None:
+        # Inherited by the uvicorn child, and read by app.py on import in inproc mode
+        os.environ["ARC_EMBED_CACHE_SIZE"] = str(args.cache_size)
+    os.environ["ARC_RESULT_CACHE_SIZE"] = str(args.result_cache_size)
+    # Synthetic template payloads must not land in ./dedup or ./reviewers, nor trip the
+    # near-duplicate and burst rules while being measured
+    os.environ["ARC_DEDUP_CAPACITY"] = "0"
+    os.environ["ARC_REVIEWERS_DB"] = ""
+    rng = random.Random(args.seed)
+    real = load_real_texts(args.texts_from)
+    server = None
+    if args.mode == "http":
+        port = free_port()
+        server = start_server(port)
+        call = http_client(port)
+    else:
+        call = inproc_client()
+
+    results = {"mode": args.mode, "configs": []}
+    try:
+        for bs in [int(b) for b in args.batch_sizes.split(",")]:
+            payloads = [make_payload(bs, rng, real) for _ in range(args.requests)]
+            call(payloads[0])  # warm caches and lazy init outside the measurement
+            for conc in [int(c) for c in args.concurrency.split(",")]:
+                res = run_config(call, payloads, conc)
+                res.update({"batch_size": bs, "concurrency": conc})
+                results["configs"].append(res)
+                lat = res["latency"]
+                print(f"batch {bs:>3} x conc {conc:>3}: {res['reviews_per_s']:8.1f} reviews/s | "
+                      f"p50 {lat.get('p50_ms', float('nan')):7.1f} ms | p95 {lat.get('p95_ms', float('nan')):7.1f} ms | "
+                      f"p99 {lat.get('p99_ms', float('nan')):7.1f} ms | errors {res['errors']}")
+        results["peak_rss_mb"] = peak_rss_mb(server.pid if server else None)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(f"peak RSS: {results['peak_rss_mb']:.0f} MB")
+    write_results(args.out, "service", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Latency and resident memory: sklearn predict_proba vs the compiled tree arrays.
+
+Each predictor is loaded in a fresh subprocess so peak RSS reflects only that
+path. The sklearn child unpickles the whole bundle (encoder included), so its
+RSS is an upper bound; the interesting number is the per-batch latency. Inputs
+are random embeddings of the classifier's width.
+
+    python benchmarks/bench_trees.py --model arc_model.pkl --compiled arc_trees
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from common import ROOT, peak_rss_mb
+
+
+def run_child(mode: str, model: str, compiled: str, batch_sizes, repeats: int) -> dict:
+    from tree_predictor import CompiledGBC
+
+    rss_before = peak_rss_mb()
+    t0 = time.perf_counter()
+    if mode == "sklearn":
+        with open(model, "rb") as f:
+            predictor = pickle.load(f)["classifier"]
+    else:
+        predictor = CompiledGBC.load(compiled)
+    load_s = time.perf_counter() - t0
+
+    rng = np.random.default_rng(0)
+    latencies = {}
+    for bs in batch_sizes:
+        X = rng.normal(scale=0.05, size=(bs, predictor.n_features_in_)).astype(np.float32)
+        predictor.predict_proba(X)  # warm
+        times = []
+        for _ in range(repeats):
+            t = time.perf_counter()
+            predictor.predict_proba(X)
+            times.append(time.perf_counter() - t)
+        latencies[str(bs)] = {
+            "p50_ms": float(np.percentile(times, 50) * 1000),
+            "p95_ms": float(np.percentile(times, 95) * 1000),
+            "rows_per_s": float(bs / np.median(times)),
+        }
+    return {
+        "mode": mode,
+        "load_s": load_s,
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_before_load_mb": rss_before,
+        "latency": latencies,
+    }
+
+
+def check_agreement(model: str, compiled: str, n: int = 2000) -> float:
+    from tree_predictor import CompiledGBC
+
+    with open(model, "rb") as f:
+        clf = pickle.load(f)["classifier"]
+    comp = CompiledGBC.load(compiled)
+    X = np.random.default_rng(1).normal(scale=0.05, size=(n, comp.n_features_in_)).astype(np.float32)
+    return float(np.abs(clf.predict_proba(X) - comp.predict_proba(X)).max())
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--model", default=os.path.join(ROOT, "arc_model.pkl"))
+    ap.add_argument("--compiled", default=os.path.join(ROOT, "arc_trees"))
+    ap.add_argument("--batch-sizes", default="1,16,64,256")
+    ap.add_argument("--repeats", type=int, default=20)
+    ap.add_argument("--child", choices=["sklearn", "compiled"], help=argparse.SUPPRESS)
+    ap.add_argument("--out", help="write JSON results here")
+    args = ap.parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.model, args.compiled, batch_sizes, args.repeats)))
+        return
+
+    results = {"max_abs_diff": check_agreement(args.model, args.compiled)}
+    for mode in ("sklearn", "compiled"):
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--model", args.model,
+             "--compiled", args.compiled, "--batch-sizes", args.batch_sizes,
+             "--repeats", str(args.repeats)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results[mode] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"max |p_sklearn - p_compiled| = {results['max_abs_diff']:.2e}")
+    for bs in map(str, batch_sizes):
+        sk = results["sklearn"]["latency"][bs]["p50_ms"]
+        cp = results["compiled"]["latency"][bs]["p50_ms"]
+        print(f"batch {bs:>4}: sklearn {sk:8.2f} ms | compiled {cp:8.2f} ms | {sk / cp:5.1f}x")
+    print(f"peak RSS: sklearn {results['sklearn']['peak_rss_mb']:.0f} MB | "
+          f"compiled {results['compiled']['peak_rss_mb']:.0f} MB")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Synthetic /score payloads in the ReviewIn shape.
+
+Texts mix the adversarial corpora from train_model.py (generic spam and AI
+templates) with long multi-sentence reviews, so lengths roughly follow the
+training distribution. Pass `real_texts` (e.g. from the training snapshot) to
+sample real review bodies instead.
+"""
+from __future__ import annotations
+import random
+from typing import Dict, List, Optional, Sequence
+
+import common  # noqa: F401  (puts the repo root on sys.path)
+from train_model import AI_TEMPLATES, GENERIC_TEMPLATES, make_fake_text
+
+NAMES = ["Jane D.", "Amazon Customer", "user58213", "mike_r", "abcd1234xy", "Priya S.", "Tom"]
+
+
+def long_text(rng: random.Random) -> str:
+    # 3-6 detailed sentences, in the range of the >150 char "detailed" training reviews
+    return " ".join(rng.choice(AI_TEMPLATES) for _ in range(rng.randint(3, 6)))
+
+
+def make_text(rng: random.Random, real_texts: Optional[Sequence[str]] = None) -> str:
+    if real_texts and rng.random() < 0.5:
+        return rng.choice(real_texts)
+    roll = rng.random()
+    if roll < 0.3:
+        return long_text(rng)
+    if roll < 0.4:
+        return rng.choice(GENERIC_TEMPLATES)
+    return make_fake_text(rng)
+
+
+def make_review(rng: random.Random, real_texts: Optional[Sequence[str]] = None) -> Dict:
+    text = make_text(rng, real_texts)
+    title, _, body = text.partition(". ")
+    return {
+        "review_title": title[:80],
+        "review_body": body or text,
+        "verified_purchase": rng.random() < 0.7,
+        "image_count": rng.choice([0, 0, 0, 1, 3]),
+        "author_name": rng.choice(NAMES),
+    }
+
+
+def make_payload(n: int, rng: random.Random, real_texts: Optional[Sequence[str]] = None) -> Dict[str, List[Dict]]:
+    return {"reviews": [make_review(rng, real_texts) for _ in range(n)]}
+
+
+def load_real_texts(path: Optional[str], limit: int = 20000) -> List[str]:
+    """Review texts from a training snapshot / load_reviews Parquet, if given."""
+    if not path:
+        return []
+    import pandas as pd
+    df = pd.read_parquet(path)
+    col = "text" if "text" in df.columns else "review_text"
+    texts = df[col].dropna().astype(str)
+    return texts.sample(min(limit, len(texts)), random_state=0).tolist()
@@ -0,0 +1,93 @@
+"""Length-bucketed, token-budgeted batching in front of SentenceTransformer.encode.
+
+A transformer batch is padded to its longest member, so mixing "Good. Nice."
+with multi-paragraph reviews spends most of the compute on padding. Texts are
+tokenized once to get their lengths (after truncation to `max_tokens`), sorted,
+and cut into batches whose padded size (rows x longest row) stays under
+`token_budget`: short texts go in large batches, long ones in small batches.
+Embeddings are returned in the caller's order.
+
+Training (train_model.py) and serving (pipeline.py) both encode through this,
+so the same truncation policy applies to the embeddings the classifier was fit
+on and the ones it scores.
+"""
+from __future__ import annotations
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+# Tokens kept per text; all-MiniLM-L6-v2 was trained with 256
+MAX_TOKENS = 256
+# Padded tokens (rows x longest row) per forward pass
+TOKEN_BUDGET = 8192
+# Keep the start of long reviews ("right" truncation) or their end ("left")
+TRUNCATION_SIDE = "right"
+
+
+def plan_batches(lengths: Sequence[int], token_budget: int = TOKEN_BUDGET,
+                 max_batch: int = 512) -> List[np.ndarray]:
+    """Indices per batch, shortest texts first, each batch within `token_budget` padded tokens."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(lengths, kind="stable")
+    batches, start = [], 0
+    for end in range(1, len(order) + 1):
+        # Sorted ascending, so the newest row is the longest one in the batch
+        if end - start > 1 and ((end - start) * lengths[order[end - 1]] > token_budget or end - start > max_batch):
+            batches.append(order[start:end - 1])
+            start = end - 1
+    if start < len(order):
+        batches.append(order[start:])
+    return batches
+
+
+def padding_stats(lengths: Sequence[int], batches: Sequence[np.ndarray]) -> Tuple[int, int]:
+    """(real tokens, padded tokens) for a batch plan."""
+    lengths = np.asarray(lengths, dtype=np.int64)
+    real = int(lengths.sum())
+    padded = int(sum(len(b) * lengths[b].max() for b in batches if len(b)))
+    return real, padded
+
+
+class BucketedEncoder:
+    def __init__(self, encoder, max_tokens: int = MAX_TOKENS, token_budget: int = TOKEN_BUDGET,
+                 truncation_side: str = TRUNCATION_SIDE):
+        self.encoder = encoder
+        self.max_tokens = max_tokens
+        self.token_budget = token_budget
+        self.truncation_side = truncation_side
+        self.tokenizer = getattr(encoder, "tokenizer", None)
+        # SentenceTransformer truncates to max_seq_length itself; keep it in line with the plan
+        if hasattr(encoder, "max_seq_length"):
+            encoder.max_seq_length = max_tokens
+        if self.tokenizer is not None:
+            self.tokenizer.truncation_side = truncation_side
+
+    def token_lengths(self, texts: Sequence[str]) -> np.ndarray:
+        if self.tokenizer is None:
+            # Rough wordpiece estimate for encoders without a tokenizer attribute
+            return np.fromiter((min(self.max_tokens, int(len(t.split()) * 1.3) + 2) for t in texts),
+                               dtype=np.int64, count=len(texts))
+        enc = self.tokenizer(list(texts), add_special_tokens=True, truncation=True,
+                             max_length=self.max_tokens, return_attention_mask=False,
+                             return_token_type_ids=False)
+        return np.fromiter((len(ids) for ids in enc["input_ids"]), dtype=np.int64, count=len(texts))
+
+    def encode(self, texts: Sequence[str], show_progress: bool = False) -> np.ndarray:
+        """Embeddings for `texts` in their original order."""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        lengths = self.token_lengths(texts)
+        batches = plan_batches(lengths, self.token_budget)
+        out = None
+        done = 0
+        for i, idx in enumerate(batches):
+            vecs = np.asarray(self.encoder.encode([texts[j] for j in idx], batch_size=len(idx),
+                                                  show_progress_bar=False), dtype=np.float32)
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+            out[idx] = vecs
+            done += len(idx)
+            if show_progress and (i % 50 == 0 or i == len(batches) - 1):
+                print(f"   🧮 {done:,}/{len(texts):,} texts encoded ({i + 1}/{len(batches)} batches)")
+        return out
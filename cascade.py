@@ -0,0 +1,131 @@
+"""Cheap first stage of the scoring cascade.
+
+Hashed character and word n-grams feed a linear model that scores every text in
+microseconds. Texts it is confident about (very low or very high P(real)) are
+settled right there; only the uncertain band in between goes on to the
+transformer + GradientBoosting stage. The band edges are tuned on held-out data
+so the first stage agrees with the full model on a target share of the reviews
+it settles. Agreement means landing in the same semantic rule band
+(rules.ml_band), since that, not the 0.5 real/fake call, is what moves the
+total a user sees.
+
+Hashing needs no vocabulary, so the saved stage is just the weight vector plus
+a small JSON file with the hashing parameters and thresholds.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from rules import ml_band
+
+WEIGHTS = "coef.npy"
+META = "first_stage.json"
+
+# Share of settled reviews on which the first stage must agree with the full model
+TARGET_AGREEMENT = 0.99
+N_FEATURES = 2 ** 18
+CHAR_NGRAMS = (3, 5)
+WORD_NGRAMS = (1, 2)
+
+
+def _vectorizers(n_features: int, char_ngrams: Sequence[int], word_ngrams: Sequence[int]):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    common = dict(n_features=n_features, alternate_sign=False, lowercase=True, dtype=np.float32)
+    return (
+        HashingVectorizer(analyzer="char_wb", ngram_range=tuple(char_ngrams), **common),
+        HashingVectorizer(analyzer="word", ngram_range=tuple(word_ngrams), **common),
+    )
+
+
+def featurize(texts: Sequence[str], vectorizers) -> "scipy.sparse.csr_matrix":
+    from scipy.sparse import hstack
+    return hstack([v.transform(texts) for v in vectorizers], format="csr")
+
+
+class FirstStage:
+    """Linear model over hashed n-grams with an uncertain band [low, high]."""
+
+    def __init__(self, coef: np.ndarray, intercept: float, low: float = 0.0, high: float = 1.0,
+                 meta: Optional[Dict] = None):
+        self.meta = dict(meta or {})
+        self.coef = coef
+        self.intercept = float(intercept)
+        self.low = float(low)
+        self.high = float(high)
+        self.n_features = int(self.meta.get("n_features", N_FEATURES))
+        self.char_ngrams = tuple(self.meta.get("char_ngrams", CHAR_NGRAMS))
+        self.word_ngrams = tuple(self.meta.get("word_ngrams", WORD_NGRAMS))
+        self._vectorizers = _vectorizers(self.n_features, self.char_ngrams, self.word_ngrams)
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], labels: Sequence[int], n_features: int = N_FEATURES,
+            C: float = 4.0) -> "FirstStage":
+        from sklearn.linear_model import LogisticRegression
+        meta = {"n_features": n_features, "char_ngrams": list(CHAR_NGRAMS), "word_ngrams": list(WORD_NGRAMS)}
+        X = featurize(texts, _vectorizers(n_features, CHAR_NGRAMS, WORD_NGRAMS))
+        model = LogisticRegression(C=C, solver="liblinear", max_iter=1000)
+        model.fit(X, np.asarray(labels))
+        return cls(model.coef_[0].astype(np.float32), model.intercept_[0], meta=meta)
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """P(real) per text, as float64 so it slots into the same array as full-model scores."""
+        if not len(texts):
+            return np.zeros(0)
+        z = featurize(texts, self._vectorizers) @ self.coef + self.intercept
+        return 1.0 / (1.0 + np.exp(-np.asarray(z, dtype=np.float64)))
+
+    def resolved(self, scores: np.ndarray) -> np.ndarray:
+        """Mask of scores outside the uncertain band, i.e. settled by this stage."""
+        return (scores <= self.low) | (scores >= self.high)
+
+    def tune(self, scores: np.ndarray, full_scores: np.ndarray,
+             target: float = TARGET_AGREEMENT) -> Tuple[float, float]:
+        """Widest band edges whose settled reviews agree with the full model on >= `target` of them.
+
+        A settled review agrees when its first-stage score falls in the same rule band as the full model's.
+        """
+        order = np.argsort(scores, kind="stable")
+        s = scores[order]
+        same = (ml_band(s) == ml_band(np.asarray(full_scores)[order]))
+        n = np.arange(1, len(s) + 1)
+
+        # Low edge: the k lowest-scored reviews are settled; keep the largest k that stays on target
+        agree = np.cumsum(same) / n
+        ok = np.flatnonzero((agree >= target) & (s < 0.5))
+        self.low = float(s[ok[-1]]) if len(ok) else -1.0
+
+        # High edge: the same from the top
+        s_desc = s[::-1]
+        agree = np.cumsum(same[::-1]) / n
+        ok = np.flatnonzero((agree >= target) & (s_desc >= 0.5))
+        self.high = float(s_desc[ok[-1]]) if len(ok) else 2.0
+
+        self.meta["target_agreement"] = target
+        return self.low, self.high
+
+    def report(self, scores: np.ndarray, full_scores: np.ndarray) -> Dict[str, float]:
+        """Share settled per stage and rule-band agreement with the full model on the settled part."""
+        settled = self.resolved(scores)
+        agree = ml_band(scores[settled]) == ml_band(np.asarray(full_scores)[settled])
+        return {
+            "first_stage_share": float(settled.mean()) if len(scores) else 0.0,
+            "full_model_share": float(1.0 - settled.mean()) if len(scores) else 0.0,
+            "agreement": float(agree.mean()) if len(agree) else 1.0,
+        }
+
+    def save(self, path: str) -> None:
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, WEIGHTS), np.ascontiguousarray(self.coef))
+        meta = dict(self.meta, intercept=self.intercept, low=self.low, high=self.high)
+        with open(os.path.join(path, META), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = "r") -> "FirstStage":
+        with open(os.path.join(path, META)) as f:
+            meta = json.load(f)
+        coef = np.load(os.path.join(path, WEIGHTS), mmap_mode=mmap_mode)
+        return cls(coef, meta.pop("intercept"), meta.pop("low"), meta.pop("high"), meta)
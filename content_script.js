@@ -18,13 +18,42 @@ function getAuthorName(node) {
   return el ? el.innerText.trim() : "Unknown";
 }
 
+// Account id from the profile link (/gp/profile/amzn1.account.XXXX), the same id as reviewer_id in the dumps
+function getReviewerId(node) {
+  const link = pick(node, 'a.a-profile[href*="amzn1.account."]');
+  const m = link && link.getAttribute('href').match(/amzn1\.account\.([A-Z0-9]+)/);
+  return m ? m[1] : null;
+}
+
+// "4.0 out of 5 stars" -> 4.0
+function getRating(node) {
+  const el = pick(node, '[data-hook="review-star-rating"], [data-hook="cmps-review-star-rating"]');
+  const m = el && el.innerText.match(/(\d+(?:[.,]\d)?)/);
+  return m ? parseFloat(m[1].replace(',', '.')) : null;
+}
+
+// "Reviewed in the United States on March 3, 2024"; the server parses the date out
+function getReviewDate(node) {
+  const el = pick(node, '[data-hook="review-date"]');
+  return el ? el.innerText.trim() : null;
+}
+
 // --- API COMMUNICATION ---
-async function getScoresFromBackend(reviews) {
+// Streams scores through background.js; onResult(index, score) fires as each sub-batch lands.
+// Resolves once the stream ends (or fails), so callers can fill in whatever never arrived.
+function streamScoresFromBackend(reviews, onResult) {
   return new Promise(resolve => {
-    chrome.runtime.sendMessage({ type: "ARC_GET_SCORES", payload: { reviews } }, resp => {
-      if (resp && resp.ok && resp.body) resolve(resp.body.scores);
-      else resolve(null);
+    const port = chrome.runtime.connect({ name: "ARC_STREAM" });
+    port.onMessage.addListener(msg => {
+      if (msg.type === "chunk" && msg.body.results) {
+        msg.body.results.forEach(r => onResult(r.index, r));
+      } else if (msg.type === "done" || msg.type === "error" || msg.body?.error) {
+        port.disconnect();
+        resolve();
+      }
     });
+    port.onDisconnect.addListener(() => resolve());
+    port.postMessage({ type: "ARC_STREAM_SCORES", payload: { reviews } });
   });
 }
 
@@ -54,21 +83,25 @@ async function processReviews() {
     review_body: pick(el, '[data-hook="review-body"]')?.innerText || "",
     verified_purchase: isVerified(el),
     image_count: getImageCount(el),
-    author_name: getAuthorName(el)
+    author_name: getAuthorName(el),
+    review_id: el.id || null,
+    reviewer_id: getReviewerId(el),
+    rating: getRating(el),
+    review_date: getReviewDate(el)
   }));
 
-  // 2. GET SCORES
-  const scores = await getScoresFromBackend(payload);
-
-  // 3. RENDER UI
-  unbadged.forEach((el, index) => {
+  // 2. GET SCORES + 3. RENDER UI as each result streams in
+  const render = (el, data) => {
     // Safety check: Don't add if already added
     if (el.querySelector('.arc-trust-btn')) return;
-
-    // Default object if API fails or returns null
-    const data = scores ? scores[index] : { total: 50, label: "Analyzing...", reasons: [], history: "Unknown" }; 
     injectTrustUI(el, data);
+  };
+  await streamScoresFromBackend(payload, (index, data) => {
+    if (unbadged[index]) render(unbadged[index], data);
   });
+
+  // Default object for anything the API never scored
+  unbadged.forEach(el => render(el, { total: 50, label: "Analyzing...", reasons: [], history: "Unknown" }));
 }
 
 function injectTrustUI(reviewNode, data) {
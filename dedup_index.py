@@ -0,0 +1,211 @@
+"""Incremental near-duplicate index over scored review texts (MinHash + LSH).
+
+Every text is reduced to a MinHash signature over hashed character shingles.
+The signature is cut into bands, and each band is a key into a hash table of
+slots. Reviews that share any band are candidates; the share of equal
+signature values estimates their Jaccard similarity. Queries only touch their
+own buckets, so cost does not grow with the number of indexed reviews.
+
+Memory is bounded: signatures live in a fixed-capacity ring and the oldest
+entry is evicted (and unlinked from its buckets) when the ring wraps. The ring
+is snapshotted to a single .npz file; buckets are rebuilt from it on restore.
+"""
+from __future__ import annotations
+import hashlib
+import itertools
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Set, Union
+
+import numpy as np
+
+from embedding_cache import KEY_BYTES, normalize_text
+
+SHINGLE = 5
+NUM_PERM = 32
+BANDS = 8
+# Estimated Jaccard at or above which two texts count as near-duplicates
+THRESHOLD = 0.8
+# Shorter texts ("Great product!") repeat by chance and are neither indexed nor matched
+MIN_CHARS = 20
+# Bound on candidates compared per query; beyond it the count is a lower bound
+MAX_CANDIDATES = 4096
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    """32-bit hashes of all SHINGLE-byte windows of the lowercased UTF-8 text."""
+    b = np.frombuffer(text.lower().encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+    if len(b) < SHINGLE:
+        b = np.pad(b, (0, SHINGLE - len(b)))
+    windows = np.lib.stride_tricks.sliding_window_view(b, SHINGLE)
+    powers = np.uint64(1099511628211) ** np.arange(SHINGLE, dtype=np.uint64)  # wraps mod 2**64
+    return np.unique(((windows * powers).sum(axis=1) >> np.uint64(16)) & _MASK32)
+
+
+class NearDuplicateIndex:
+    def __init__(self, capacity: int = 100_000, num_perm: int = NUM_PERM, bands: int = BANDS,
+                 threshold: float = THRESHOLD, seed: int = 0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.capacity = capacity
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hash family: h_i(x) = ((a_i * x + b_i) mod 2**64) >> 32, a_i odd
+        self._a = rng.integers(1, 2 ** 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64)
+        self.signatures = np.zeros((capacity, num_perm), dtype=np.uint32)
+        self.keys = np.zeros((capacity, KEY_BYTES), dtype=np.uint8)
+        self.size = 0
+        self.cursor = 0
+        self._band_mix = rng.integers(1, 2 ** 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self.slot_of: Dict[bytes, int] = {}
+        # Most buckets hold a single slot, stored as a bare int; a set only once a band is shared
+        self.buckets: List[Dict[int, Union[int, Set[int]]]] = [{} for _ in range(bands)]
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.matches = 0
+
+    def signature(self, text: str) -> np.ndarray:
+        h = _shingle_hashes(text)
+        return (((self._a * h + self._b) >> np.uint64(32)).min(axis=1)).astype(np.uint32)
+
+    def _band_keys(self, sig: np.ndarray) -> List[int]:
+        # One 64-bit int per band; a rare collision only adds a candidate that fails the similarity check
+        return (sig.reshape(self.bands, self.rows).astype(np.uint64) * self._band_mix).sum(axis=1).tolist()
+
+    def _link(self, slot: int) -> None:
+        for band, key in zip(self.buckets, self._band_keys(self.signatures[slot])):
+            members = band.get(key)
+            if members is None:
+                band[key] = slot
+            elif isinstance(members, int):
+                band[key] = {members, slot}
+            else:
+                members.add(slot)
+
+    def _unlink(self, slot: int) -> None:
+        for band, key in zip(self.buckets, self._band_keys(self.signatures[slot])):
+            members = band.get(key)
+            if members is None:
+                continue
+            if isinstance(members, int):
+                if members == slot:
+                    del band[key]
+                continue
+            members.discard(slot)
+            if len(members) == 1:
+                band[key] = members.pop()
+        self.slot_of.pop(self.keys[slot].tobytes(), None)
+
+    def _count(self, sig: np.ndarray, own: Optional[int]) -> int:
+        candidates: Set[int] = set()
+        for band, key in zip(self.buckets, self._band_keys(sig)):
+            members = band.get(key)
+            if isinstance(members, int):
+                candidates.add(members)
+            elif members:
+                candidates.update(itertools.islice(members, MAX_CANDIDATES - len(candidates)))
+                if len(candidates) >= MAX_CANDIDATES:
+                    break
+        candidates.discard(own)
+        if not candidates:
+            return 0
+        slots = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self.signatures[slots] == sig).mean(axis=1)
+        return int((similarity >= self.threshold).sum())
+
+    def query_and_add(self, texts: Sequence[str], keys: Sequence[bytes]) -> np.ndarray:
+        """Near-duplicates already indexed for each text, indexing each text after its query.
+
+        `keys` identify reviews (not texts), so re-scoring the same review does not
+        count it as a copy of itself while identical texts by other reviewers do count.
+        """
+        counts = np.zeros(len(texts), dtype=np.int64)
+        prepared = []
+        for i, (text, key) in enumerate(zip(texts, keys)):
+            text = normalize_text(text)
+            if len(text) >= MIN_CHARS:
+                prepared.append((i, key, self.signature(text)))
+        with self._lock:
+            # One at a time, so copies arriving in the same batch also see each other
+            for i, key, sig in prepared:
+                counts[i] = self._count(sig, self.slot_of.get(key))
+                if key in self.slot_of:
+                    continue
+                slot = self.cursor
+                if self.size == self.capacity:
+                    self._unlink(slot)
+                self.signatures[slot] = sig
+                self.keys[slot] = np.frombuffer(key, dtype=np.uint8)
+                self.slot_of[key] = slot
+                self._link(slot)
+                self.cursor = (slot + 1) % self.capacity
+                self.size = min(self.size + 1, self.capacity)
+            self.queries += len(prepared)
+            self.matches += int((counts > 0).sum())
+        return counts
+
+    def save(self, path: str) -> None:
+        """Atomic snapshot of the ring; buckets are rebuilt on load."""
+        with self._lock:
+            state = dict(
+                signatures=self.signatures[:self.size].copy(),
+                keys=self.keys[:self.size].copy(),
+                cursor=np.int64(self.cursor),
+                params=np.array([self.capacity, self.num_perm, self.bands], dtype=np.int64),
+                a=self._a,
+            )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **state)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, capacity: int, threshold: float = THRESHOLD) -> "NearDuplicateIndex":
+        """Restore a snapshot; a snapshot with other hashing parameters is ignored."""
+        index = cls(capacity=capacity, threshold=threshold)
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as z:
+            _, num_perm, bands = (int(v) for v in z["params"])
+            if (num_perm, bands) != (index.num_perm, index.bands) or not np.array_equal(z["a"], index._a):
+                print(f"⚠️ Near-duplicate snapshot {path} uses other hash parameters; starting empty")
+                return index
+            signatures, keys, cursor = z["signatures"], z["keys"], int(z["cursor"])
+        # Oldest first (a full ring starts at its cursor), keeping the newest `capacity` entries
+        order = np.roll(np.arange(len(signatures)), -cursor)[-capacity:]
+        n = len(order)
+        index.signatures[:n] = signatures[order]
+        index.keys[:n] = keys[order]
+        index.size = n
+        index.cursor = n % capacity
+        for slot in range(n):
+            index.slot_of[index.keys[slot].tobytes()] = slot
+            index._link(slot)
+        return index
+
+    def metric_lines(self) -> List[str]:
+        return [
+            "# TYPE arc_near_duplicate_entries gauge",
+            f"arc_near_duplicate_entries {self.size}",
+            "# TYPE arc_near_duplicate_queries_total counter",
+            f"arc_near_duplicate_queries_total {self.queries}",
+            "# TYPE arc_near_duplicate_matches_total counter",
+            f"arc_near_duplicate_matches_total {self.matches}",
+        ]
+
+
+def review_key(r, text: str) -> bytes:
+    """Identity of a review: its id when the client sends one, else author + text."""
+    h = hashlib.blake2b(digest_size=KEY_BYTES)
+    if getattr(r, "review_id", None):
+        h.update(b"id\x00" + str(r.review_id).encode("utf-8"))
+    else:
+        h.update(b"text\x00" + str(r.author_name or "").encode("utf-8") + b"\x00")
+        h.update(normalize_text(text).encode("utf-8"))
+    return h.digest()
@@ -0,0 +1,234 @@
+"""Content-addressed embedding cache that sits in front of encoder.encode.
+
+Embeddings are keyed by a hash of (encoder identity, normalized text), kept in
+an in-memory LRU and optionally in a memory-mapped on-disk tier that survives
+restarts. Only cache misses are sent to the transformer.
+"""
+from __future__ import annotations
+import functools
+import hashlib
+import json
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+KEY_BYTES = 16
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace; the tokenizer splits on it anyway, so this is lossless."""
+    return " ".join(str(text or "").split())
+
+
+def text_key(text: Optional[str], encoder_id: str) -> bytes:
+    h = hashlib.blake2b(digest_size=KEY_BYTES)
+    h.update(encoder_id.encode("utf-8"))
+    h.update(b"\x00")
+    h.update(normalize_text(text).encode("utf-8"))
+    return h.digest()
+
+
+class DiskTier:
+    """Fixed-capacity ring of vectors in a memmap; oldest slots are overwritten first.
+
+    Single writer: the index and cursor live in this process, so two processes must
+    never open the same path (pool workers each get their own, see use_private_disk).
+    """
+
+    def __init__(self, path: str, dim: int, capacity: int, encoder_id: str, dtype: str = "float16"):
+        self.path = path
+        self.dim = dim
+        self.capacity = capacity
+        self.dtype = np.dtype(dtype)
+        os.makedirs(path, exist_ok=True)
+        meta_path = os.path.join(path, "meta.json")
+        meta = {}
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+        fresh = (
+            meta.get("dim") != dim
+            or meta.get("capacity") != capacity
+            or meta.get("dtype") != self.dtype.name
+            or meta.get("encoder_id") != encoder_id
+        )
+        mode = "w+" if fresh else "r+"
+        self.keys = np.memmap(os.path.join(path, "keys.bin"), dtype=f"S{KEY_BYTES}", mode=mode, shape=(capacity,))
+        self.vectors = np.memmap(os.path.join(path, "vectors.bin"), dtype=self.dtype, mode=mode, shape=(capacity, dim))
+        self.encoder_id = encoder_id
+        self.cursor = 0 if fresh else int(meta.get("cursor", 0)) % capacity
+        self.index: Dict[bytes, int] = {}
+        if not fresh:
+            for slot, k in enumerate(self.keys):
+                if k:
+                    # S-dtype reads drop trailing NUL bytes; restore the full key
+                    self.index[bytes(k).ljust(KEY_BYTES, b"\x00")] = slot
+
+    def get(self, key: bytes) -> Optional[np.ndarray]:
+        slot = self.index.get(key)
+        if slot is None:
+            return None
+        if bytes(self.keys[slot]) != key.rstrip(b"\x00"):
+            # Slot was overwritten behind our index (e.g. files shared with another process)
+            del self.index[key]
+            return None
+        return np.array(self.vectors[slot])
+
+    def put(self, key: bytes, vec: np.ndarray) -> None:
+        if key in self.index:
+            return
+        slot = self.cursor
+        old = bytes(self.keys[slot])
+        if old:
+            self.index.pop(old, None)
+        self.keys[slot] = key
+        self.vectors[slot] = vec
+        self.index[key] = slot
+        self.cursor = (slot + 1) % self.capacity
+
+    def flush(self) -> None:
+        self.keys.flush()
+        self.vectors.flush()
+        with open(os.path.join(self.path, "meta.json"), "w") as f:
+            json.dump({
+                "dim": self.dim,
+                "capacity": self.capacity,
+                "dtype": self.dtype.name,
+                "encoder_id": self.encoder_id,
+                "cursor": self.cursor,
+            }, f)
+
+
+def _reset_lock_after_fork(ref) -> None:
+    cache = ref()
+    if cache is not None:
+        cache._lock = threading.Lock()
+
+
+class EmbeddingCache:
+    """Bounded LRU of embeddings with an optional memory-mapped disk tier."""
+
+    def __init__(
+        self,
+        encoder_id: str,
+        max_entries: int = 50000,
+        disk_path: Optional[str] = None,
+        disk_capacity: int = 500000,
+        disk_dtype: str = "float16",
+        dtype: str = "float32",
+    ):
+        self.encoder_id = encoder_id
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.disk_capacity = disk_capacity
+        self.disk_dtype = disk_dtype
+        # Vectors are held and returned in this dtype (int8/float16 when the pipeline caches compressed codes)
+        self.dtype = np.dtype(dtype)
+        self.disk: Optional[DiskTier] = None
+        self._mem: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        if hasattr(os, "register_at_fork"):
+            # Forked inference workers must not inherit a lock held by a parent thread
+            os.register_at_fork(after_in_child=functools.partial(_reset_lock_after_fork, weakref.ref(self)))
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._open_existing_disk()
+
+    def _open_existing_disk(self) -> None:
+        if self.disk_path and os.path.exists(os.path.join(self.disk_path, "meta.json")):
+            with open(os.path.join(self.disk_path, "meta.json")) as f:
+                self._ensure_disk(json.load(f)["dim"])
+
+    def use_private_disk(self, suffix: str) -> None:
+        """Move the disk tier to `<disk_path>-<suffix>`, for a forked worker that must not share the parent's files."""
+        if not self.disk_path:
+            return
+        with self._lock:
+            self.disk = None
+            self.disk_path = f"{self.disk_path}-{suffix}"
+            self._open_existing_disk()
+
+    def _ensure_disk(self, dim: int) -> None:
+        # A brand-new disk tier is created on the first miss, once the embedding dim is known
+        if self.disk is None and self.disk_path:
+            self.disk = DiskTier(self.disk_path, dim, self.disk_capacity, self.encoder_id, self.disk_dtype)
+
+    def _remember(self, key: bytes, vec: np.ndarray) -> None:
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def _lookup(self, key: bytes) -> Optional[np.ndarray]:
+        vec = self._mem.get(key)
+        if vec is not None:
+            self._mem.move_to_end(key)
+            self.hits += 1
+            return vec
+        if self.disk is not None:
+            vec = self.disk.get(key)
+            if vec is not None:
+                vec = vec.astype(self.dtype, copy=False)
+                self._remember(key, vec)
+                self.hits += 1
+                self.disk_hits += 1
+                return vec
+        return None
+
+    def encode(self, texts: Sequence[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Return embeddings for `texts`, calling `encode_fn` only on uncached ones."""
+        keys = [text_key(t, self.encoder_id) for t in texts]
+        found: Dict[bytes, np.ndarray] = {}
+        miss_keys: List[bytes] = []
+        miss_texts: List[str] = []
+        pending = set()
+        with self._lock:
+            for k, t in zip(keys, texts):
+                if k in found:
+                    self.hits += 1
+                    continue
+                vec = self._lookup(k)
+                if vec is not None:
+                    found[k] = vec
+                elif k not in pending:
+                    pending.add(k)
+                    miss_keys.append(k)
+                    miss_texts.append(t)
+                    self.misses += 1
+                else:
+                    self.hits += 1
+
+        if miss_texts:
+            fresh = np.asarray(encode_fn(miss_texts), dtype=self.dtype)
+            with self._lock:
+                self._ensure_disk(fresh.shape[1])
+                for k, vec in zip(miss_keys, fresh):
+                    found[k] = vec
+                    self._remember(k, vec)
+                    if self.disk is not None:
+                        self.disk.put(k, vec)
+
+        if not keys:
+            return np.zeros((0, 0), dtype=self.dtype)
+        return np.stack([found[k] for k in keys])
+
+    def flush(self) -> None:
+        with self._lock:
+            if self.disk is not None:
+                self.disk.flush()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "entries": len(self._mem),
+            "disk_entries": len(self.disk.index) if self.disk is not None else 0,
+        }
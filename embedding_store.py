@@ -0,0 +1,99 @@
+"""Persistent, sharded embedding store for training.
+
+Embeddings live in append-only `.npy` shards under `<root>/<encoder name>/`,
+each paired with a `.keys.npy` file of text hashes (see embedding_cache.text_key).
+Shards are opened memory-mapped, so a retraining run only encodes texts it has
+never seen and reads everything else straight from disk.
+"""
+from __future__ import annotations
+import glob
+import os
+import re
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from embedding_cache import KEY_BYTES, text_key
+
+DATASET_FILE = "dataset.parquet"
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+
+
+class EmbeddingStore:
+    def __init__(self, root: str, encoder_name: str):
+        self.root = root
+        self.encoder_name = encoder_name
+        self.path = os.path.join(root, _slug(encoder_name))
+        os.makedirs(self.path, exist_ok=True)
+        self.shards: List[np.ndarray] = []
+        self.index: Dict[bytes, Tuple[int, int]] = {}
+        for vec_path in sorted(glob.glob(os.path.join(self.path, "shard_*[0-9].npy"))):
+            self._open_shard(vec_path)
+
+    def _open_shard(self, vec_path: str) -> None:
+        keys = np.load(vec_path[:-len(".npy")] + ".keys.npy")
+        shard_id = len(self.shards)
+        self.shards.append(np.load(vec_path, mmap_mode="r"))
+        for row, k in enumerate(keys):
+            # S-dtype reads drop trailing NUL bytes; restore the full key
+            self.index.setdefault(bytes(k).ljust(KEY_BYTES, b"\x00"), (shard_id, row))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys_for(self, texts: Sequence[str]) -> List[bytes]:
+        return [text_key(t, self.encoder_name) for t in texts]
+
+    def missing(self, texts: Sequence[str]) -> List[int]:
+        """Positions of `texts` that have no stored embedding yet."""
+        return [i for i, k in enumerate(self.keys_for(texts)) if k not in self.index]
+
+    def add(self, texts: Sequence[str], vectors: np.ndarray, shard_rows: int = 50000) -> None:
+        """Append embeddings for `texts` as new shards (existing keys are skipped)."""
+        keys = self.keys_for(texts)
+        seen = set()
+        keep = []
+        for i, k in enumerate(keys):
+            if k not in self.index and k not in seen:
+                seen.add(k)
+                keep.append(i)
+        if not keep:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        for start in range(0, len(keep), shard_rows):
+            rows = keep[start:start + shard_rows]
+            base = os.path.join(self.path, f"shard_{len(self.shards):05d}")
+            np.save(base + ".keys.npy", np.array([keys[i] for i in rows], dtype=f"S{KEY_BYTES}"))
+            # Vectors go last so a crash never leaves a shard without its keys
+            np.save(base + ".npy", vectors[rows])
+            self._open_shard(base + ".npy")
+
+    def get(self, texts: Sequence[str]) -> np.ndarray:
+        """Gather stored embeddings for `texts`; every text must already be stored."""
+        locs = [self.index[k] for k in self.keys_for(texts)]
+        if not locs:
+            return np.zeros((0, 0), dtype=np.float32)
+        dim = self.shards[locs[0][0]].shape[1]
+        out = np.empty((len(locs), dim), dtype=np.float32)
+        # Gather shard by shard so each memmap is read with one fancy index
+        shard_ids = np.fromiter((s for s, _ in locs), dtype=np.int64, count=len(locs))
+        rows = np.fromiter((r for _, r in locs), dtype=np.int64, count=len(locs))
+        for sid in np.unique(shard_ids):
+            mask = shard_ids == sid
+            out[mask] = self.shards[sid][rows[mask]]
+        return out
+
+    def encode(self, texts: Sequence[str], encode_fn: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+        """Embeddings for `texts`, running `encode_fn` only on texts not in the store."""
+        todo = self.missing(texts)
+        if todo:
+            # Encode each distinct new text once
+            new_texts = list(dict.fromkeys(texts[i] for i in todo))
+            print(f"   🧮 {len(new_texts)} new texts to encode, {len(texts) - len(todo)} loaded from store")
+            self.add(new_texts, encode_fn(new_texts))
+        else:
+            print(f"   💽 All {len(texts)} embeddings loaded from store")
+        return self.get(texts)
@@ -0,0 +1,144 @@
+"""Parallel streaming ingestion of the Amazon review JSONL dumps.
+
+Every dataset file is split into byte ranges that are parsed in a process pool.
+Length filters run inside the workers, and each worker keeps a bottom-k
+reservoir (every kept row gets a uniform random key; the k smallest keys win).
+Merging reservoirs is then just taking the k smallest keys again, so the final
+sample is uniform over the whole file in a single pass, not the head of it.
+"""
+from __future__ import annotations
+import ast
+import heapq
+import json
+import os
+import random
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # optional speedup
+    _loads = json.loads
+
+CHUNK_BYTES = 64 * 1024 * 1024
+
+# Smart Filtering: Only keep useful data
+DETAILED_MIN_LEN = 150   # Detailed Real Reviews (High Trust Anchors)
+SHORT_MIN_LEN = 15       # Short but SPECIFIC Real Reviews (Hard Negatives)
+SHORT_MAX_LEN = 80
+
+# (random key, text, kind) where kind is "detailed" or "short"
+Sampled = Tuple[float, str, str]
+
+
+def parse_line(line: bytes):
+    try:
+        return _loads(line)
+    except ValueError:
+        # Older UCSD dumps are Python dict literals rather than JSON
+        try:
+            return ast.literal_eval(line.decode("utf-8", "replace"))
+        except Exception:
+            return None
+
+
+def classify(row) -> Tuple[str, str]:
+    """Returns (text, kind) or ("", "") if the row is filtered out."""
+    if not isinstance(row, dict):
+        return "", ""
+    text = str(row.get("reviewText") or row.get("text") or row.get("body") or "")
+    n = len(text)
+    if n > DETAILED_MIN_LEN:
+        return text, "detailed"
+    if SHORT_MIN_LEN < n < SHORT_MAX_LEN:
+        return text, "short"
+    return "", ""
+
+
+def _offer(heap: List, k: int, item: Sampled) -> None:
+    # Max-heap on the key (stored negated) holding the k smallest keys seen so far
+    if len(heap) < k:
+        heapq.heappush(heap, (-item[0], item[1], item[2]))
+    elif item[0] < -heap[0][0]:
+        heapq.heapreplace(heap, (-item[0], item[1], item[2]))
+
+
+def scan_range(path: str, start: int, end: int, k: int, seed: int) -> Dict:
+    """Parse the lines that begin inside [start, end) and reservoir-sample matches."""
+    rng = random.Random(seed)
+    heap: List = []
+    lines = matched = 0
+    with open(path, "rb") as f:
+        if start:
+            # Skip to the first line that begins at or after `start`; the one straddling
+            # the boundary belongs to the previous range
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            lines += 1
+            text, kind = classify(parse_line(line))
+            if kind:
+                matched += 1
+                _offer(heap, k, (rng.random(), text, kind))
+    return {
+        "sample": [(-nk, text, kind) for nk, text, kind in heap],
+        "lines": lines,
+        "matched": matched,
+        "bytes": end - start,
+    }
+
+
+def byte_ranges(path: str, chunk_bytes: int = CHUNK_BYTES) -> List[Tuple[int, int]]:
+    size = os.path.getsize(path)
+    return [(s, min(s + chunk_bytes, size)) for s in range(0, size, chunk_bytes)] or [(0, 0)]
+
+
+def ingest_files(
+    paths: Sequence[str],
+    sample_per_file: int,
+    workers: Optional[int] = None,
+    chunk_bytes: int = CHUNK_BYTES,
+    seed: int = 0,
+) -> Dict[str, Dict]:
+    """Sample up to `sample_per_file` filtered reviews from each file, uniformly.
+
+    Returns {path: {"detailed": [...], "short": [...], "lines", "matched", "bytes"}}.
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = []
+    for path in paths:
+        for i, (start, end) in enumerate(byte_ranges(path, chunk_bytes)):
+            jobs.append((path, start, end, seed * 1_000_003 + zlib.crc32(f"{os.path.basename(path)}:{i}".encode())))
+
+    results: Dict[str, Dict] = {
+        p: {"detailed": [], "short": [], "lines": 0, "matched": 0, "bytes": 0, "_heap": []} for p in paths
+    }
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(path, pool.submit(scan_range, path, s, e, sample_per_file, sd)) for path, s, e, sd in jobs]
+        for path, fut in futures:
+            part = fut.result()
+            res = results[path]
+            res["lines"] += part["lines"]
+            res["matched"] += part["matched"]
+            res["bytes"] += part["bytes"]
+            for item in part["sample"]:
+                _offer(res["_heap"], sample_per_file, item)
+    elapsed = time.perf_counter() - t0
+
+    total_bytes = total_lines = 0
+    for path, res in results.items():
+        for _, text, kind in res.pop("_heap"):
+            res[kind].append(text)
+        total_bytes += res["bytes"]
+        total_lines += res["lines"]
+    mb = total_bytes / 1e6
+    print(f"   ⏱️ Ingested {mb:,.1f} MB / {total_lines:,} lines in {elapsed:.1f}s "
+          f"({mb / max(elapsed, 1e-9):,.1f} MB/s, {total_lines / max(elapsed, 1e-9):,.0f} lines/s, {workers} workers)")
+    return results
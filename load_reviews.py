@@ -1,6 +1,6 @@
 from __future__ import annotations
-import json, pathlib
-from typing import List, Dict, Any, Optional
+import hashlib, json, pathlib
+from typing import Iterator, List, Dict, Any, Optional
 import pandas as pd
 
 # Map your extension keys -> canonical column names for the DF
@@ -24,27 +24,62 @@ CANONICAL_ORDER = [
     "helpful_count", "review_text", "review_length"
 ]
 
-def _read_json_any(path: pathlib.Path) -> List[Dict[str, Any]]:
-    """Reads either array JSON or NDJSON."""
-    text = path.read_text(encoding="utf-8").strip()
-    if not text:
-        return []
-    # Try array JSON
-    if text[0] == "[":
-        data = json.loads(text)
-        if isinstance(data, dict):
-            # Some exporters wrap in {"data":[...]}
-            data = data.get("data", [])
-        if not isinstance(data, list):
-            raise ValueError("Top-level JSON must be a list (array JSON).")
-        return data
-    # Fallback: NDJSON (one JSON object per line)
-    rows = []
-    for line in text.splitlines():
-        line = line.strip()
-        if line:
-            rows.append(json.loads(line))
-    return rows
+READ_BUF_CHARS = 1 << 20
+
+def _iter_json_array(f, bufsize: int = READ_BUF_CHARS) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    buf, pos, eof = "", 0, False
+    started = False
+    while True:
+        # Skip whitespace / separators, refilling the buffer as needed
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = f.read(bufsize), 0
+            eof = not buf
+        if pos >= len(buf):
+            raise ValueError("Unterminated JSON array.")
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Top-level JSON must be a list (array JSON).")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+            if end == len(buf) and not eof:
+                raise ValueError("value may continue past the buffer")
+        except ValueError:
+            if eof:
+                raise
+            more = f.read(bufsize)
+            eof = not more
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        pos = end
+
+def _iter_json_any(path: pathlib.Path) -> Iterator[Dict[str, Any]]:
+    """Streams rows from either array JSON or NDJSON."""
+    with path.open("r", encoding="utf-8") as f:
+        head = f.read(4096).lstrip()
+        f.seek(0)
+        if not head:
+            return
+        # Try array JSON
+        if head[0] == "[":
+            yield from _iter_json_array(f)
+            return
+        # Fallback: NDJSON (one JSON object per line)
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
 
 def _rename_and_clean(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     out = []
@@ -76,12 +111,7 @@ def _rename_and_clean(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         out.append(m)
     return out
 
-def load_reviews_df(json_path: str | pathlib.Path, limit: int = 10) -> pd.DataFrame:
-    """Load up to `limit` reviews into a normalized DataFrame."""
-    p = pathlib.Path(json_path)
-    rows = _read_json_any(p)
-    rows = rows[:limit] if limit is not None else rows
-    rows = _rename_and_clean(rows)
+def _canonical_frame(rows: List[Dict[str, Any]]) -> pd.DataFrame:
     if not rows:
         return pd.DataFrame(columns=CANONICAL_ORDER)
     df = pd.DataFrame(rows)
@@ -89,13 +119,105 @@ def load_reviews_df(json_path: str | pathlib.Path, limit: int = 10) -> pd.DataFr
     for col in CANONICAL_ORDER:
         if col not in df.columns:
             df[col] = None
-    df = df[CANONICAL_ORDER]
-    # Drop obvious dupes by review_id + review_text (if present)
-    subset = [c for c in ("review_id", "review_text") if c in df.columns]
-    if subset:
-        df = df.drop_duplicates(subset=subset, keep="first").reset_index(drop=True)
+    return df[CANONICAL_ORDER]
+
+def _dedup_key(review_id: Any, review_text: str) -> bytes:
+    return hashlib.blake2b(f"{review_id}\x00{review_text}".encode("utf-8"), digest_size=16).digest()
+
+def iter_review_chunks(
+    json_path: str | pathlib.Path,
+    chunk_size: int = 10000,
+    limit: Optional[int] = None,
+) -> Iterator[pd.DataFrame]:
+    """Stream normalized DataFrames of at most `chunk_size` rows.
+
+    Reads NDJSON or array JSON incrementally and stops as soon as `limit` raw
+    rows were consumed, so memory is bounded by the chunk, not the file.
+    Duplicates by review_id + review_text are dropped across chunks.
+    """
+    seen = set()
+    batch: List[Dict[str, Any]] = []
+    consumed = 0
+
+    def flush() -> Optional[pd.DataFrame]:
+        rows = []
+        for r in _rename_and_clean(batch):
+            k = _dedup_key(r.get("review_id"), r["review_text"])
+            if k not in seen:
+                seen.add(k)
+                rows.append(r)
+        batch.clear()
+        return _canonical_frame(rows) if rows else None
+
+    for row in _iter_json_any(pathlib.Path(json_path)):
+        if limit is not None and consumed >= limit:
+            break
+        consumed += 1
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            df = flush()
+            if df is not None:
+                yield df
+    if batch:
+        df = flush()
+        if df is not None:
+            yield df
+
+def load_reviews_df(json_path: str | pathlib.Path, limit: int = 10) -> pd.DataFrame:
+    """Load up to `limit` reviews into a normalized DataFrame."""
+    chunks = list(iter_review_chunks(json_path, limit=limit))
+    if not chunks:
+        return pd.DataFrame(columns=CANONICAL_ORDER)
+    return pd.concat(chunks, ignore_index=True)
+
+def _parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("review_id", pa.string()),
+        ("asin", pa.string()),
+        ("review_date", pa.string()),
+        ("reviewer_id", pa.string()),
+        ("rating", pa.float64()),
+        ("verified_purchase", pa.bool_()),
+        ("has_images", pa.bool_()),
+        ("has_videos", pa.bool_()),
+        ("helpful_count", pa.int64()),
+        ("review_text", pa.string()),
+        ("review_length", pa.int64()),
+    ])
+
+def _coerce_for_parquet(df: pd.DataFrame) -> pd.DataFrame:
+    # Exporters disagree on ids/dates being numbers or strings; pin them to strings
+    df = df.copy()
+    for col in ("review_id", "asin", "review_date", "reviewer_id"):
+        df[col] = df[col].map(lambda v: None if v is None or v != v else str(v))
+    df["helpful_count"] = df["helpful_count"].fillna(0).astype("int64")
     return df
 
+def write_reviews_parquet(
+    json_path: str | pathlib.Path,
+    out_path: str | pathlib.Path,
+    chunk_size: int = 50000,
+    limit: Optional[int] = None,
+) -> int:
+    """Stream a review dump into a Parquet file, one row group per chunk.
+
+    Returns the number of rows written.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    out = pathlib.Path(out_path)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    schema = _parquet_schema()
+    written = 0
+    with pq.ParquetWriter(out, schema) as writer:
+        for df in iter_review_chunks(json_path, chunk_size=chunk_size, limit=limit):
+            table = pa.Table.from_pandas(_coerce_for_parquet(df), schema=schema, preserve_index=False)
+            writer.write_table(table)
+            written += len(df)
+    return written
+
 def save_df(
     df: pd.DataFrame,
     out_path: str | pathlib.Path,
@@ -115,9 +237,14 @@ def save_df(
 if __name__ == "__main__":
     # Example CLI usage:
     #   python load_reviews.py /path/to/reviews.json
+    #   python load_reviews.py /path/to/reviews.json data/reviews.parquet   (streams the whole file)
     import sys
     in_path = sys.argv[1] if len(sys.argv) > 1 else "reviews.json"
-    df = load_reviews_df(in_path, limit=10)
-    print(df.head(10).to_string(index=False))
-    # Optionally save
-    # save_df(df, "data/reviews_sample.parquet", fmt="parquet")
+    if len(sys.argv) > 2:
+        n = write_reviews_parquet(in_path, sys.argv[2])
+        print(f"Wrote {n} reviews to {sys.argv[2]}")
+    else:
+        df = load_reviews_df(in_path, limit=10)
+        print(df.head(10).to_string(index=False))
+        # Optionally save
+        # save_df(df, "data/reviews_sample.parquet", fmt="parquet")
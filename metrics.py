@@ -0,0 +1,228 @@
+"""Minimal in-process metrics with Prometheus text exposition.
+
+Counters, gauges and histograms are module-level singletons registered in
+REGISTRY; `render()` produces the text served on /metrics. Collector callbacks
+let components with their own counters (e.g. the embedding cache) be exported
+at scrape time without being coupled to this module.
+
+Forked inference workers record into their own copy of REGISTRY; they ship it
+back with every reply as `take_deltas()` and the API process `merge()`s it, so
+/metrics covers pool mode too.
+"""
+from __future__ import annotations
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+# Seconds; covers sub-millisecond rule evaluation up to multi-second cold encodes
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+def _key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _fmt_labels(key: LabelKey, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    items = list(key) + list(extra)
+    if not items:
+        return ""
+    body = ",".join('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in items)
+    return "{" + body + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__(name, help)
+        self._values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        k = _key(labels)
+        with self._lock:
+            self._values[k] = self._values.get(k, 0.0) + amount
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_fmt_labels(k)} {v}" for k, v in self._values.items()]
+
+    def take(self) -> Dict[LabelKey, float]:
+        """Values recorded since the last take, resetting them."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: Dict[LabelKey, float]) -> None:
+        with self._lock:
+            for k, v in values.items():
+                self._values[k] = self._values.get(k, 0.0) + v
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[_key(labels)] = float(value)
+
+    def take(self) -> Dict[LabelKey, float]:
+        # Point-in-time values don't add up across processes; gauges stay where they are set
+        return {}
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help)
+        self.buckets = tuple(buckets)
+        self._counts: Dict[LabelKey, List[int]] = {}
+        self._sums: Dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        k = _key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(k)
+            if counts is None:
+                counts = self._counts[k] = [0] * (len(self.buckets) + 1)
+                self._sums[k] = 0.0
+            counts[i] += 1
+            self._sums[k] += value
+
+    def take(self) -> Dict[LabelKey, Tuple[List[int], float]]:
+        with self._lock:
+            taken = {k: (counts, self._sums[k]) for k, counts in self._counts.items()}
+            self._counts, self._sums = {}, {}
+        return taken
+
+    def merge(self, taken: Dict[LabelKey, Tuple[List[int], float]]) -> None:
+        with self._lock:
+            for k, (counts, total) in taken.items():
+                mine = self._counts.get(k)
+                if mine is None:
+                    mine = self._counts[k] = [0] * (len(self.buckets) + 1)
+                    self._sums[k] = 0.0
+                for i, c in enumerate(counts):
+                    mine[i] += c
+                self._sums[k] += total
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def lines(self) -> List[str]:
+        out = []
+        with self._lock:
+            for k, counts in self._counts.items():
+                cumulative = 0
+                for bound, c in zip(self.buckets, counts):
+                    cumulative += c
+                    out.append(f"{self.name}_bucket{_fmt_labels(k, [('le', repr(float(bound)))])} {cumulative}")
+                cumulative += counts[-1]
+                out.append(f"{self.name}_bucket{_fmt_labels(k, [('le', '+Inf')])} {cumulative}")
+                out.append(f"{self.name}_sum{_fmt_labels(k)} {self._sums[k]}")
+                out.append(f"{self.name}_count{_fmt_labels(k)} {cumulative}")
+        return out
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+        self.collectors: List[Callable[[], Iterable[str]]] = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def take_deltas(self) -> Dict[str, Dict]:
+        """Everything recorded since the last call, by metric name (see merge)."""
+        deltas = {}
+        for m in self.metrics:
+            taken = m.take()
+            if taken:
+                deltas[m.name] = taken
+        return deltas
+
+    def merge(self, deltas: Dict[str, Dict]) -> None:
+        by_name = {m.name: m for m in self.metrics}
+        for name, taken in deltas.items():
+            if name in by_name:
+                by_name[name].merge(taken)
+
+    def reset(self) -> None:
+        """Drop recorded values, e.g. the parent's counts inherited by a forked worker."""
+        self.take_deltas()
+
+    def add_collector(self, fn: Callable[[], Iterable[str]]) -> None:
+        """`fn` returns already-formatted exposition lines, evaluated on every scrape."""
+        self.collectors.append(fn)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for m in self.metrics:
+            lines += m.header() + m.lines()
+        for fn in self.collectors:
+            lines += list(fn())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "arc_stage_seconds", "Time spent per /score stage (parse, text, first_stage, encode, predict_proba, dedup, profiles, rules, serialize)."))
+REQUEST_REVIEWS = REGISTRY.register(Histogram(
+    "arc_request_reviews", "Reviews per /score request.", SIZE_BUCKETS))
+INFERENCE_BATCH_SIZE = REGISTRY.register(Histogram(
+    "arc_inference_batch_texts", "Texts per batch sent to the model.", SIZE_BUCKETS))
+ENCODED_TEXTS = REGISTRY.register(Counter(
+    "arc_encoded_texts_total", "Texts actually run through the transformer (cache misses)."))
+CASCADE_SETTLED = REGISTRY.register(Counter(
+    "arc_cascade_settled_total", "Texts scored per cascade stage (first = hashed n-gram model, full = transformer)."))
+FALLBACKS = REGISTRY.register(Counter(
+    "arc_inference_fallback_total", "Reviews scored with the default ML score because inference failed."))
+SHED = REGISTRY.register(Counter(
+    "arc_requests_shed_total", "Requests rejected with 503 because the inference queue was full."))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge(
+    "arc_model_load_seconds", "Wall time of the last model load."))
+
+
+def _reset_locks_after_fork() -> None:
+    # A lock held by another thread at fork time would stay locked forever in the child
+    for m in REGISTRY.metrics:
+        m._lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_locks_after_fork)
+
+
+def stage(name: str):
+    """Context manager timing one /score stage into arc_stage_seconds."""
+    return STAGE_SECONDS.time(stage=name)
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,150 @@
+"""Owns the active model: background loading, warmup, readiness and hot-swap.
+
+The server starts answering immediately while the model loads on a background
+thread; `/score` falls back to the default ML score until the host is ready.
+A new version is loaded and warmed next to the active one and then swapped in
+with a single reference assignment, so in-flight batches finish on the model
+they started with.
+"""
+from __future__ import annotations
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+import metrics
+from pipeline import ScoringPipeline
+
+MODEL_READY = metrics.REGISTRY.register(metrics.Gauge(
+    "arc_model_ready", "1 once a model is loaded and warmed up."))
+MODEL_INFO = metrics.REGISTRY.register(metrics.Gauge(
+    "arc_model_info", "Active model version (value is always 1)."))
+
+# Short and long texts so warmup touches both the small and the padded-batch code paths
+WARMUP_TEXTS = [
+    "Good. Nice.",
+    "Fast shipping. Five stars.",
+    "I tested the product on various surfaces, and it performed uniformly well without requiring "
+    "any additional adjustments. The build includes reinforced structural points that enhance "
+    "durability during repeated use, and it maintained stable output even after repeated cycles.",
+] * 4
+
+
+class NotReady(RuntimeError):
+    """No model has finished loading yet."""
+
+
+class Active(NamedTuple):
+    pipeline: ScoringPipeline
+    pool: Optional[object]  # WorkerPool in pool serving mode
+
+    def infer(self, texts: List[str]) -> np.ndarray:
+        return (self.pool or self.pipeline).infer(texts)
+
+    def cache_stats(self) -> Dict[str, float]:
+        # In pool mode the parent's own cache is never used; the workers report theirs
+        return self.pool.cache_stats() if self.pool is not None else self.pipeline.embedding_cache.stats()
+
+
+class ModelHost:
+    def __init__(
+        self,
+        loader: Callable[[Optional[str]], Optional[ScoringPipeline]],
+        pool_factory: Optional[Callable[[ScoringPipeline], object]] = None,
+        retire_after_s: float = 30.0,
+        identify: Optional[Callable[[Optional[str]], Optional[str]]] = None,
+    ):
+        # identify(version) -> the embedding-cache identity the loader would produce, without loading
+        self.loader = loader
+        self.identify = identify
+        self.pool_factory = pool_factory
+        self.retire_after_s = retire_after_s
+        self.active: Optional[Active] = None
+        self.error: Optional[str] = None
+        self.loading = False
+        self._swap_lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.active is not None
+
+    @property
+    def version(self) -> Optional[str]:
+        return self.active.pipeline.version if self.active is not None else None
+
+    def is_active(self, version: Optional[str] = None) -> bool:
+        """True when `version` (default: what the loader picks) is the model already being served."""
+        active = self.active
+        if active is None or self.identify is None:
+            return False
+        return self.identify(version) == active.pipeline.embedding_cache.encoder_id
+
+    def infer(self, texts: List[str]) -> np.ndarray:
+        active = self.active  # read once: a swap mid-batch must not mix models
+        if active is None:
+            raise NotReady("model is still loading")
+        return active.infer(texts)
+
+    def load_in_background(self, version: Optional[str] = None) -> None:
+        threading.Thread(target=self.load, args=(version,), name="arc-model-loader", daemon=True).start()
+
+    def load(self, version: Optional[str] = None) -> bool:
+        """Load, warm up and activate `version`; the previous model keeps serving until then."""
+        with self._swap_lock:
+            # A second pipeline for the same model would open the disk tier the active one is writing
+            if self.is_active(version):
+                print(f"✅ Model {self.version} already loaded")
+                return True
+            self.loading = True
+            pipeline = pool = None
+            try:
+                pipeline = self.loader(version)
+                if pipeline is None:
+                    self.error = "no model found"
+                    print("⚠️ No model found; serving default ML scores")
+                    return False
+                pool = self.pool_factory(pipeline) if self.pool_factory else None
+                candidate = Active(pipeline, pool)
+                t0 = time.perf_counter()
+                candidate.infer(list(WARMUP_TEXTS))
+                print(f"🔥 Warmup done in {time.perf_counter() - t0:.2f}s")
+            except Exception as e:
+                self.error = f"{type(e).__name__}: {e}"
+                print(f"❌ Error loading model: {self.error}")
+                # Don't leave the candidate's inference processes (each with a model copy) behind
+                if pool is not None:
+                    pool.stop()
+                if pipeline is not None:
+                    pipeline.close()
+                return False
+            finally:
+                self.loading = False
+
+            previous, self.active = self.active, candidate
+            self.error = None
+            MODEL_READY.set(1)
+            if previous is not None:
+                MODEL_INFO.set(0, version=previous.pipeline.version)
+                # Let batches already running on the old model drain before tearing it down
+                threading.Timer(self.retire_after_s, self._retire, args=(previous,)).start()
+            MODEL_INFO.set(1, version=pipeline.version)
+            print(f"✅ Serving model {pipeline.version}")
+            return True
+
+    def _retire(self, old: Active) -> None:
+        if old.pool is not None:
+            old.pool.stop()
+        old.pipeline.close()
+
+    def close(self) -> None:
+        if self.active is not None:
+            self._retire(self.active)
+
+    def cache_stats(self) -> Dict[str, float]:
+        active = self.active
+        return active.cache_stats() if active is not None else {}
+
+    def metric_lines(self) -> List[str]:
+        active = self.active
+        return active.pipeline.metric_lines(active.cache_stats()) if active is not None else []
@@ -0,0 +1,243 @@
+"""The ARC scoring pipeline, shared by the API server and offline scoring.
+
+Loads a versioned model artifact (see artifacts.py) or the legacy pickle bundle
+(encoder + classifier, with the compiled tree predictor swapped in when
+available), and runs texts through the cheap first stage when the artifact has
+one, then the embedding cache and the classifier for the texts it leaves
+uncertain, and finally the symbolic rule layer. When the artifact has an
+embedding projector, the cache holds the compressed vectors and the classifier
+sees the features it was trained on.
+"""
+from __future__ import annotations
+import hashlib
+import os
+import pickle
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import metrics
+import artifacts
+from embedding_cache import EmbeddingCache
+from rules import score_reviews
+from bucketed_encoder import MAX_TOKENS, TOKEN_BUDGET, TRUNCATION_SIDE, BucketedEncoder
+from cascade import FirstStage
+from projection import Projector
+from tree_predictor import CompiledGBC
+
+MODEL_PATH = "arc_model.pkl"
+COMPILED_PATH = "arc_trees"
+MODELS_DIR = "models"
+
+# Score used for every review when the model is unavailable or inference fails
+DEFAULT_ML_SCORE = 0.5
+
+
+def review_text(r) -> str:
+    return (r.review_title or "") + " " + (r.review_body or "")
+
+
+def _cache_for(encoder_id: str, version: str, cache_size: int, cache_dir: Optional[str],
+               projector: Optional[Projector] = None) -> EmbeddingCache:
+    # One disk tier per model version (per bundle file for the legacy pickle), so a hot-swapped
+    # model never shares a memmap with the old one
+    kwargs = {}
+    if projector is not None:
+        # Compressed codes are cached as-is in both tiers
+        kwargs = {"dtype": projector.dtype.name, "disk_dtype": projector.dtype.name}
+    return EmbeddingCache(
+        encoder_id=encoder_id,
+        max_entries=cache_size,
+        disk_path=os.path.join(cache_dir, version) if cache_dir else None,
+        **kwargs,
+    )
+
+
+def _resolve_source(source: Optional[str], version: Optional[str]) -> str:
+    """The legacy .pkl or artifact version directory that `source` and `version` select."""
+    if source is None:
+        source = MODELS_DIR if os.path.exists(os.path.join(MODELS_DIR, artifacts.CURRENT)) else MODEL_PATH
+    if source.endswith(".pkl") or os.path.exists(os.path.join(source, artifacts.MANIFEST)):
+        return source
+    return artifacts.resolve(source, version)
+
+
+def _legacy_encoder_id(model_path: str) -> str:
+    st = os.stat(model_path)
+    return f"{os.path.basename(model_path)}:{st.st_size}:{int(st.st_mtime)}"
+
+
+def source_id(source: Optional[str] = None, version: Optional[str] = None) -> Optional[str]:
+    """Embedding-cache identity of the model `from_source` would load, without loading it.
+
+    Equal to `pipeline.embedding_cache.encoder_id` once loaded; None if it can't be resolved.
+    """
+    try:
+        path = _resolve_source(source, version)
+        if path.endswith(".pkl"):
+            return _legacy_encoder_id(path)
+        return f"artifact:{artifacts.read_manifest(path)['version']}"
+    except (OSError, ValueError, KeyError, artifacts.ArtifactError):
+        return None
+
+
+class ScoringPipeline:
+    def __init__(self, encoder, classifier, embedding_cache: EmbeddingCache, version: str = "legacy",
+                 first_stage: Optional[FirstStage] = None, token_budget: int = TOKEN_BUDGET,
+                 max_tokens: int = MAX_TOKENS, truncation_side: str = TRUNCATION_SIDE,
+                 projector: Optional[Projector] = None):
+        self.encoder = encoder
+        # Same length bucketing and truncation the training embeddings went through
+        self.batch_encoder = BucketedEncoder(encoder, max_tokens, token_budget, truncation_side)
+        self.classifier = classifier
+        self.embedding_cache = embedding_cache
+        self.version = version
+        self.first_stage = first_stage
+        self.projector = projector
+
+    @classmethod
+    def from_source(
+        cls,
+        source: Optional[str] = None,
+        cache_size: int = 50000,
+        cache_dir: Optional[str] = None,
+        version: Optional[str] = None,
+        check_hashes: bool = True,
+        cascade: bool = True,
+        token_budget: int = TOKEN_BUDGET,
+    ) -> Optional["ScoringPipeline"]:
+        """Load from a models root (CURRENT or `version`), a version dir, or a legacy .pkl.
+
+        With no `source`, prefers MODELS_DIR and falls back to the legacy MODEL_PATH.
+        `cascade=False` ignores the artifact's first stage and sends every text to the transformer.
+        """
+        path = _resolve_source(source, version)
+        if path.endswith(".pkl"):
+            return cls.load(path, COMPILED_PATH, cache_size, cache_dir, token_budget)
+        return cls.from_artifact(path, cache_size, cache_dir, check_hashes, cascade, token_budget)
+
+    @classmethod
+    def from_artifact(cls, path: str, cache_size: int = 50000, cache_dir: Optional[str] = None,
+                      check_hashes: bool = True, cascade: bool = True,
+                      token_budget: int = TOKEN_BUDGET) -> "ScoringPipeline":
+        t0 = time.perf_counter()
+        encoder, classifier, first_stage, projector, manifest = artifacts.load_artifact(path, check_hashes)
+        version = manifest["version"]
+        metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - t0)
+        print(f"✅ Model {version} loaded in {time.perf_counter() - t0:.1f}s")
+        if first_stage is not None and cascade:
+            print(f"🪜 Cascade first stage on (uncertain band {first_stage.low:.3f}..{first_stage.high:.3f})")
+        else:
+            first_stage = None
+        if projector is not None:
+            print(f"🗜️ Embeddings compressed: {projector.method} to {projector.dim} dims, "
+                  f"{projector.dtype.name} ({projector.bytes_per_vector} bytes per review)")
+        cache = _cache_for(f"artifact:{version}", version, cache_size, cache_dir, projector)
+        encoding = manifest["metadata"].get("encoding", {})
+        return cls(encoder, classifier, cache, version, first_stage, token_budget,
+                   encoding.get("max_tokens", MAX_TOKENS), encoding.get("truncation_side", TRUNCATION_SIDE),
+                   projector)
+
+    @classmethod
+    def load(
+        cls,
+        model_path: str = MODEL_PATH,
+        compiled_path: str = COMPILED_PATH,
+        cache_size: int = 50000,
+        cache_dir: Optional[str] = None,
+        token_budget: int = TOKEN_BUDGET,
+    ) -> Optional["ScoringPipeline"]:
+        """Load the model bundle; returns None if there is no usable model."""
+        if not os.path.exists(model_path):
+            return None
+        t0 = time.perf_counter()
+        try:
+            with open(model_path, 'rb') as f:
+                bundle = pickle.load(f)
+            encoder = bundle["encoder"]
+            classifier = bundle["classifier"]
+            print("✅ Deep Learning Model (Transformer) Loaded")
+        except Exception as e:
+            print(f"❌ Error loading model: {e}")
+            return None
+
+        # Prefer the flattened tree arrays exported by train_model.py; they are memory-mapped
+        # and predict a whole batch across all trees at once
+        if os.path.isdir(compiled_path):
+            try:
+                compiled = CompiledGBC.load(compiled_path)
+                if len(compiled.roots) != len(classifier.estimators_):
+                    raise ValueError("compiled trees do not match the pickled classifier")
+                classifier = compiled
+                bundle = None  # drop the last reference to the sklearn trees
+                print("⚡ Compiled tree predictor loaded")
+            except Exception as e:
+                print(f"⚠️ Falling back to sklearn predictor: {e}")
+
+        # Keyed by the bundle file identity so a retrained model never reuses stale vectors,
+        # nor the disk tier the previous bundle is still reading
+        encoder_id = _legacy_encoder_id(model_path)
+        tier = "legacy-" + hashlib.sha1(encoder_id.encode("utf-8")).hexdigest()[:12]
+        cache = _cache_for(encoder_id, tier, cache_size, cache_dir)
+        metrics.MODEL_LOAD_SECONDS.set(time.perf_counter() - t0)
+        return cls(encoder, classifier, cache, token_budget=token_budget)
+
+    def infer(self, texts: List[str]) -> np.ndarray:
+        """Texts -> P(real). The first stage settles confident texts; the rest take the full model."""
+        metrics.INFERENCE_BATCH_SIZE.observe(len(texts))
+        if self.first_stage is None:
+            return self._full_model(texts)
+        with metrics.stage("first_stage"):
+            scores = self.first_stage.predict_proba(texts)
+            uncertain = np.flatnonzero(~self.first_stage.resolved(scores))
+        metrics.CASCADE_SETTLED.inc(len(texts) - len(uncertain), stage="first")
+        if len(uncertain):
+            scores[uncertain] = self._full_model([texts[i] for i in uncertain])
+            metrics.CASCADE_SETTLED.inc(len(uncertain), stage="full")
+        return scores
+
+    def _full_model(self, texts: List[str]) -> np.ndarray:
+        """Encodes only cache misses, then runs the classifier."""
+        with metrics.stage("encode"):
+            vectors = self.embedding_cache.encode(texts, self._encode_misses)
+        with metrics.stage("predict_proba"):
+            return self.classifier.predict_proba(self.features(vectors))[:, 1]
+
+    def _encode_misses(self, texts: List[str]) -> np.ndarray:
+        metrics.ENCODED_TEXTS.inc(len(texts))
+        return self.compress(self.batch_encoder.encode(texts))
+
+    def compress(self, embeddings: np.ndarray) -> np.ndarray:
+        """Encoder output -> the form kept in the embedding cache."""
+        return embeddings if self.projector is None else self.projector.compress(embeddings)
+
+    def features(self, vectors: np.ndarray) -> np.ndarray:
+        """Cached vectors -> classifier input."""
+        return vectors if self.projector is None else self.projector.decompress(vectors)
+
+    def as_worker(self, slot: int) -> None:
+        """Run in a forked pool worker before it serves: the disk tier is single-writer, so each worker gets its own."""
+        self.embedding_cache.use_private_disk(f"w{slot}")
+
+    def metric_lines(self, stats: Optional[Dict[str, float]] = None) -> List[str]:
+        """Embedding cache counters (this pipeline's, or `stats` from pool workers) in Prometheus text form."""
+        st = stats if stats is not None else self.embedding_cache.stats()
+        return [
+            "# TYPE arc_embedding_cache_hits_total counter",
+            f"arc_embedding_cache_hits_total {st['hits']}",
+            "# TYPE arc_embedding_cache_disk_hits_total counter",
+            f"arc_embedding_cache_disk_hits_total {st['disk_hits']}",
+            "# TYPE arc_embedding_cache_misses_total counter",
+            f"arc_embedding_cache_misses_total {st['misses']}",
+            "# TYPE arc_embedding_cache_entries gauge",
+            f"arc_embedding_cache_entries{{tier=\"memory\"}} {st['entries']}",
+            f"arc_embedding_cache_entries{{tier=\"disk\"}} {st['disk_entries']}",
+        ]
+
+    def score(self, reviews: Sequence) -> List[dict]:
+        """Full hybrid score for ReviewIn-like objects, without cross-request batching."""
+        return score_reviews(reviews, self.infer([review_text(r) for r in reviews]))
+
+    def close(self) -> None:
+        self.embedding_cache.flush()
@@ -0,0 +1,122 @@
+"""Optional compression of sentence embeddings before the classifier and the caches.
+
+MiniLM embeddings are 384 float32 values (1.5 KB per review). A projector maps
+them down to `dim` features, with PCA (fit on the training embeddings) or a
+fixed Gaussian random projection, and stores the result as float16 or as int8
+codes with a per-feature scale. The classifier is trained on exactly what
+`decompress(compress(x))` returns, so serving with the projector gives the same
+scores as the report from train_model.py.
+
+Saved alongside the model (see artifacts.py) as a couple of .npy arrays plus a
+small JSON file.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+META = "projection.json"
+ARRAYS = ("components", "mean", "scale")
+
+METHODS = ("none", "pca", "random")
+DTYPES = ("float32", "float16", "int8")
+DEFAULT_DIM = 128
+# Rows used to fit PCA; the covariance of a 384-dim embedding settles long before 100k reviews
+PCA_FIT_ROWS = 50_000
+INT8_MAX = 127
+
+
+class Projector:
+    def __init__(self, components: Optional[np.ndarray], mean: np.ndarray, scale: Optional[np.ndarray], meta: Dict):
+        # components: (input_dim, dim) or None for quantization only
+        self.components = None if components is None else np.asarray(components, dtype=np.float32)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = None if scale is None else np.asarray(scale, dtype=np.float32)
+        self.method = meta["method"]
+        self.dtype = np.dtype(meta["dtype"])
+        self.input_dim = meta["input_dim"]
+        self.dim = meta["dim"]
+        self.meta = meta
+
+    @classmethod
+    def fit(cls, X: np.ndarray, method: str = "pca", dim: Optional[int] = DEFAULT_DIM,
+            dtype: str = "int8", seed: int = 0) -> "Projector":
+        if method not in METHODS:
+            raise ValueError(f"Unknown projection method {method!r} (expected one of {METHODS})")
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown storage dtype {dtype!r} (expected one of {DTYPES})")
+        X = np.asarray(X, dtype=np.float32)
+        input_dim = X.shape[1]
+        rng = np.random.default_rng(seed)
+        meta = {"method": method, "dtype": dtype, "input_dim": int(input_dim), "dim": int(input_dim)}
+        mean = np.zeros(input_dim, dtype=np.float32)
+        components = None
+        if method != "none":
+            dim = int(min(dim or input_dim, input_dim))
+            meta["dim"] = dim
+            if method == "pca":
+                sample = X if len(X) <= PCA_FIT_ROWS else X[rng.choice(len(X), PCA_FIT_ROWS, replace=False)]
+                mean = sample.mean(axis=0)
+                _, s, vt = np.linalg.svd(sample - mean, full_matrices=False)
+                components = vt[:dim].T
+                var = s ** 2
+                meta["explained_variance"] = float(var[:dim].sum() / var.sum())
+            else:
+                # Johnson-Lindenstrauss: distances are kept up to ~1/sqrt(dim) distortion
+                components = rng.standard_normal((input_dim, dim)).astype(np.float32) / np.sqrt(dim)
+        proj = cls(components, mean, None, meta)
+        if dtype == "int8":
+            # Symmetric per-feature scale from the training range; outliers beyond it are clipped
+            Z = proj.project(X)
+            proj.scale = np.maximum(np.abs(Z).max(axis=0), 1e-12).astype(np.float32) / INT8_MAX
+        return proj
+
+    def project(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if self.components is None:
+            return X
+        return (X - self.mean) @ self.components
+
+    def compress(self, X: np.ndarray) -> np.ndarray:
+        """Embeddings -> stored form: (n, dim) in `self.dtype`."""
+        Z = self.project(X)
+        if self.dtype == np.int8:
+            return np.clip(np.rint(Z / self.scale), -INT8_MAX, INT8_MAX).astype(np.int8)
+        return Z.astype(self.dtype)
+
+    def decompress(self, codes: np.ndarray) -> np.ndarray:
+        """Stored form -> float32 classifier features."""
+        if self.dtype == np.int8:
+            return np.asarray(codes, dtype=np.float32) * self.scale
+        return np.asarray(codes, dtype=np.float32)
+
+    def transform(self, X: np.ndarray) -> np.ndarray:
+        """Embeddings -> the features the classifier was trained on."""
+        return self.decompress(self.compress(X))
+
+    @property
+    def bytes_per_vector(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def save(self, path: str) -> str:
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            value = getattr(self, name)
+            if value is not None:
+                np.save(os.path.join(path, f"{name}.npy"), value)
+        with open(os.path.join(path, META), "w") as f:
+            json.dump(self.meta, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path: str) -> "Projector":
+        with open(os.path.join(path, META)) as f:
+            meta = json.load(f)
+        arrays = {}
+        for name in ARRAYS:
+            full = os.path.join(path, f"{name}.npy")
+            arrays[name] = np.load(full) if os.path.exists(full) else None
+        mean = arrays["mean"] if arrays["mean"] is not None else np.zeros(meta["input_dim"], dtype=np.float32)
+        return cls(arrays["components"], mean, arrays["scale"], meta)
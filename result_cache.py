@@ -0,0 +1,93 @@
+"""Server-side cache of finished /score results, keyed by review fingerprint and model version.
+
+A fingerprint is a hash of every field the score depends on, the Amazon review
+id included. It is never the id alone: the cache is shared between clients, and
+a body posted under someone else's review id must not become the result served
+for the genuine review. background.js computes the same value, so a client can
+ask for results by fingerprint alone (/score/lookup) and only send review
+bodies for misses. Entries expire after a TTL, because profile and
+near-duplicate signals keep moving after a review was first scored.
+"""
+from __future__ import annotations
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def fingerprint(r) -> str:
+    """Must match fingerprintReview() in background.js."""
+    rating = getattr(r, "rating", None)
+    parts = [
+        str(getattr(r, "review_id", None) or ""),
+        r.review_title or "",
+        r.review_body or "",
+        r.author_name or "",
+        "1" if r.verified_purchase else "0",
+        str(int(r.image_count or 0)),
+        str(getattr(r, "reviewer_id", None) or ""),
+        "" if rating is None else f"{float(rating):.1f}",
+        str(getattr(r, "review_date", None) or ""),
+    ]
+    return "sha256:" + hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+class ResultCache:
+    """Thread-safe LRU of result dicts with a per-entry TTL."""
+
+    def __init__(self, max_entries: int = 100_000, ttl_s: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._data: "OrderedDict[Tuple[str, str], Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, fingerprints: Sequence[str], version: str) -> List[Optional[dict]]:
+        """Cached result per fingerprint (a fresh copy) or None."""
+        now = time.monotonic()
+        out: List[Optional[dict]] = []
+        with self._lock:
+            for fp in fingerprints:
+                entry = self._data.get((fp, version))
+                if entry is not None and entry[0] < now:
+                    del self._data[(fp, version)]
+                    entry = None
+                if entry is None:
+                    out.append(None)
+                    self.misses += 1
+                    continue
+                self._data.move_to_end((fp, version))
+                out.append(dict(entry[1]))
+                self.hits += 1
+        return out
+
+    def put_many(self, fingerprints: Sequence[str], version: str, results: Sequence[dict]) -> None:
+        expires = time.monotonic() + self.ttl_s
+        with self._lock:
+            for fp, result in zip(fingerprints, results):
+                self._data[(fp, version)] = (expires, dict(result))
+                self._data.move_to_end((fp, version))
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._data),
+        }
+
+    def metric_lines(self) -> List[str]:
+        st = self.stats()
+        return [
+            "# TYPE arc_result_cache_hits_total counter",
+            f"arc_result_cache_hits_total {st['hits']}",
+            "# TYPE arc_result_cache_misses_total counter",
+            f"arc_result_cache_misses_total {st['misses']}",
+            "# TYPE arc_result_cache_entries gauge",
+            f"arc_result_cache_entries {st['entries']}",
+        ]
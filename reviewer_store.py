@@ -0,0 +1,298 @@
+"""Per-reviewer profiles backing the behavioral layer and "Reviewer History".
+
+Profiles are kept column-wise in NumPy arrays (one row per reviewer, a dict
+from reviewer key to row), so a batch lookup is a single fancy-index gather
+and an update touches a fixed number of cells. Rows track review counts,
+rating and length sums, the verified share, first/last review time and a small
+ring of recent review times for burst detection.
+
+Dirty rows are flushed to SQLite periodically and loaded back at start. The
+store can be backfilled from the Parquet written by load_reviews.py:
+
+    python reviewer_store.py data/reviews.parquet --db reviewers/reviewers.sqlite
+"""
+from __future__ import annotations
+import argparse
+import datetime
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from dedup_index import review_key
+from rules import is_suspicious_name
+
+# Recent review times kept per reviewer; bursts are counted among these
+RECENT = 8
+BURST_WINDOW_S = 24 * 3600
+# Reviews already counted, so re-scoring the same page doesn't inflate profiles (or repeat a
+# review time in the burst ring): the newest keys in memory, every key in the SQLite seen table
+SEEN_CAPACITY = 200_000
+
+SCALARS = ("count", "rating_n", "rating_sum", "rating_sq", "length_sum", "verified_n", "first_ts", "last_ts")
+
+_DATE_IN_TEXT = re.compile(r"([A-Z][a-z]+ \d{1,2}, \d{4})")
+
+
+def parse_review_date(value) -> float:
+    """Epoch seconds from epoch s/ms numbers, ISO strings or Amazon's "... on March 3, 2024"; NaN if unknown."""
+    if value is None or value != value:
+        return float("nan")
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        v = float(value)
+        return v / 1000.0 if v > 1e11 else v
+    s = str(value).strip()
+    if s.isdigit():
+        return parse_review_date(int(s))
+    try:
+        dt = datetime.datetime.fromisoformat(s.replace("Z", "+00:00"))
+    except ValueError:
+        m = _DATE_IN_TEXT.search(s)
+        if not m:
+            return float("nan")
+        try:
+            dt = datetime.datetime.strptime(m.group(1), "%B %d, %Y")
+        except ValueError:
+            return float("nan")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.timestamp()
+
+
+def reviewer_key(reviewer_id=None, author_name=None) -> Optional[str]:
+    """Stable reviewer identity: the account id when known, else a non-generic display name."""
+    if reviewer_id is not None and reviewer_id == reviewer_id and str(reviewer_id).strip():
+        return "id:" + str(reviewer_id).strip()
+    # "Amazon Customer", "Unknown" and handle-like names are shared by many people; don't merge them
+    if author_name and author_name != "Unknown" and not is_suspicious_name(author_name):
+        return "name:" + " ".join(str(author_name).lower().split())
+    return None
+
+
+class ReviewerStore:
+    def __init__(self, db_path: Optional[str] = None, initial_capacity: int = 1024):
+        self.db_path = db_path
+        self.rows: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self.capacity = 0
+        self.cols: Dict[str, np.ndarray] = {}
+        self.recent = np.zeros((0, RECENT))
+        self.recent_pos = np.zeros(0, dtype=np.int32)
+        self.seen: "OrderedDict[bytes, None]" = OrderedDict()
+        # Counted but not flushed yet; may already have dropped out of `seen`
+        self._new_seen: Dict[bytes, None] = {}
+        # Whether the seen table holds keys no longer in memory; until then it needn't be queried
+        self._seen_spilled = False
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._grow(initial_capacity)
+        self._db = None
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS reviewers (key TEXT PRIMARY KEY, "
+                + ", ".join(f"{c} REAL" for c in SCALARS)
+                + ", recent BLOB, recent_pos INTEGER);"
+                "CREATE TABLE IF NOT EXISTS seen (key BLOB PRIMARY KEY);"
+            )
+            self._load()
+
+    def _grow(self, capacity: int) -> None:
+        def resized(a, fill):
+            out = np.full((capacity,) + a.shape[1:], fill, dtype=a.dtype)
+            out[:len(a)] = a
+            return out
+
+        for c in SCALARS:
+            fill = np.nan if c.endswith("_ts") else 0.0
+            self.cols[c] = resized(self.cols.get(c, np.zeros(0)), fill)
+        self.recent = resized(self.recent, np.nan)
+        self.recent_pos = resized(self.recent_pos, 0)
+        self.capacity = capacity
+
+    def _row(self, key: str) -> int:
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == self.capacity:
+                self._grow(self.capacity * 2)
+            self.rows[key] = row
+            self.keys.append(key)
+        return row
+
+    def _load(self) -> None:
+        t0 = time.perf_counter()
+        cur = self._db.execute(f"SELECT key, {', '.join(SCALARS)}, recent, recent_pos FROM reviewers")
+        for rec in cur:
+            row = self._row(rec[0])
+            for c, v in zip(SCALARS, rec[1:1 + len(SCALARS)]):
+                self.cols[c][row] = np.nan if v is None else v
+            self.recent[row] = np.frombuffer(rec[-2], dtype=np.float64)
+            self.recent_pos[row] = rec[-1]
+        newest = self._db.execute("SELECT key FROM seen ORDER BY rowid DESC LIMIT ?", (SEEN_CAPACITY + 1,)).fetchall()
+        self._seen_spilled = len(newest) > SEEN_CAPACITY
+        for (k,) in reversed(newest[:SEEN_CAPACITY]):
+            self.seen[bytes(k)] = None
+        if self.rows:
+            print(f"👥 Loaded {len(self.rows):,} reviewer profiles in {time.perf_counter() - t0:.1f}s")
+
+    def _already_counted(self, review_keys: Sequence[bytes]) -> set:
+        """The subset of `review_keys` counted before: in memory, pending flush or in the seen table."""
+        counted = {k for k in review_keys if k in self.seen or k in self._new_seen}
+        if self._db is not None and self._seen_spilled:
+            missing = list(set(review_keys) - counted)
+            for start in range(0, len(missing), 500):
+                part = missing[start:start + 500]
+                rows = self._db.execute(f"SELECT key FROM seen WHERE key IN ({', '.join('?' * len(part))})", part)
+                counted.update(bytes(k) for (k,) in rows)
+        return counted
+
+    def _remember_seen(self, review_key: bytes) -> None:
+        self.seen[review_key] = None
+        if len(self.seen) > SEEN_CAPACITY:
+            self.seen.popitem(last=False)
+            self._seen_spilled = True
+
+    def lookup(self, keys: Sequence[Optional[str]], dates: Sequence[float]) -> Dict[str, np.ndarray]:
+        """Profile columns for a batch (zeros/NaN for unknown reviewers), as the rule layer reads them.
+
+        Call after `update`, so every review counts itself and re-scoring gives the same numbers.
+        """
+        n = len(keys)
+        dates = np.asarray(dates, dtype=np.float64)
+        with self._lock:
+            rows = np.fromiter((self.rows.get(k, -1) if k is not None else -1 for k in keys), dtype=np.int64, count=n)
+            known = rows >= 0
+            r = np.where(known, rows, 0)
+            count, rating_n, rating_sum, length_sum, verified_n = (
+                np.where(known, self.cols[c][r], 0.0)
+                for c in ("count", "rating_n", "rating_sum", "length_sum", "verified_n")
+            )
+            recent = np.where(known[:, None], self.recent[r], np.nan)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return {
+                "reviewer_reviews": count.astype(np.int64),
+                "reviewer_verified_ratio": np.where(count > 0, verified_n / count, np.nan),
+                "reviewer_mean_rating": np.where(rating_n > 0, rating_sum / rating_n, np.nan),
+                "reviewer_mean_length": np.where(count > 0, length_sum / count, np.nan),
+                # Reviews by the same reviewer within BURST_WINDOW_S of this one (itself included)
+                "burst": (np.abs(recent - dates[:, None]) <= BURST_WINDOW_S).sum(axis=1).astype(np.int64),
+            }
+
+    def update(self, keys: Sequence[Optional[str]], review_keys: Sequence[bytes], ratings: Sequence[float],
+               lengths: Sequence[int], verified: Sequence[bool], dates: Sequence[float]) -> int:
+        """Count each not-yet-seen review into its reviewer's row; returns how many were new."""
+        added = 0
+        with self._lock:
+            counted = self._already_counted([rk for key, rk in zip(keys, review_keys) if key is not None])
+            for key, rk, rating, length, ver, ts in zip(keys, review_keys, ratings, lengths, verified, dates):
+                if key is None or rk in counted:
+                    continue
+                counted.add(rk)
+                self._remember_seen(rk)
+                self._new_seen[rk] = None
+                row = self._row(key)
+                c = self.cols
+                c["count"][row] += 1
+                if rating == rating and rating is not None:
+                    c["rating_n"][row] += 1
+                    c["rating_sum"][row] += rating
+                    c["rating_sq"][row] += rating * rating
+                c["length_sum"][row] += length
+                c["verified_n"][row] += bool(ver)
+                if ts == ts:
+                    c["first_ts"][row] = np.fmin(c["first_ts"][row], ts)
+                    c["last_ts"][row] = np.fmax(c["last_ts"][row], ts)
+                    pos = self.recent_pos[row]
+                    self.recent[row, pos] = ts
+                    self.recent_pos[row] = (pos + 1) % RECENT
+                self._dirty.add(row)
+                added += 1
+        return added
+
+    def flush(self) -> int:
+        """Write dirty rows and newly seen review keys to SQLite; returns rows written."""
+        if self._db is None:
+            return 0
+        # Held through the write: lookups query the same SQLite connection
+        with self._lock:
+            dirty, self._dirty = sorted(self._dirty), set()
+            new_seen, self._new_seen = list(self._new_seen), {}
+            records = [
+                (self.keys[row],)
+                + tuple(None if v != v else float(v) for v in (self.cols[c][row] for c in SCALARS))
+                + (self.recent[row].tobytes(), int(self.recent_pos[row]))
+                for row in dirty
+            ]
+            with self._db:
+                self._db.executemany(
+                    f"INSERT OR REPLACE INTO reviewers (key, {', '.join(SCALARS)}, recent, recent_pos) "
+                    f"VALUES ({', '.join('?' * (len(SCALARS) + 3))})",
+                    records,
+                )
+                self._db.executemany("INSERT OR IGNORE INTO seen (key) VALUES (?)", [(k,) for k in new_seen])
+        return len(records)
+
+    def backfill_parquet(self, path: str, batch_size: int = 100_000) -> int:
+        """Fold a load_reviews.py Parquet file into the profiles; returns reviews counted."""
+        import pyarrow.parquet as pq
+        from pipeline import review_text
+        from score_batch import to_review
+
+        wanted = ["review_id", "reviewer_id", "rating", "verified_purchase", "review_length", "review_date",
+                  "review_text", "review_title", "author_name"]
+        pf = pq.ParquetFile(path)
+        columns = [c for c in wanted if c in pf.schema_arrow.names]
+        total = 0
+        for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+            df = batch.to_pandas()
+            keys = [reviewer_key(rid) for rid in df["reviewer_id"]]
+            # Same review keys as the API (and score_batch.py) build for the same row, so a review
+            # later scored live is not counted twice
+            reviews = [to_review(row) for row in df.to_dict("records")]
+            rkeys = [review_key(r, review_text(r)) for r in reviews]
+            ratings = df["rating"].astype(float).to_numpy()
+            lengths = df["review_length"].fillna(0).astype(np.int64).to_numpy()
+            verified = df["verified_purchase"].fillna(False).astype(bool).to_numpy()
+            dates = [parse_review_date(d) for d in df["review_date"]]
+            total += self.update(keys, rkeys, ratings, lengths, verified, dates)
+        return total
+
+    def metric_lines(self) -> List[str]:
+        return [
+            "# TYPE arc_reviewer_profiles gauge",
+            f"arc_reviewer_profiles {len(self.rows)}",
+        ]
+
+    def close(self) -> None:
+        if self._db is not None:
+            self.flush()
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Backfill reviewer profiles from load_reviews.py Parquet.")
+    ap.add_argument("parquet", nargs="+")
+    ap.add_argument("--db", default=os.path.join("reviewers", "reviewers.sqlite"))
+    args = ap.parse_args()
+
+    store = ReviewerStore(args.db)
+    for path in args.parquet:
+        t0 = time.perf_counter()
+        n = store.backfill_parquet(path)
+        print(f"   📂 {path}: {n:,} reviews in {time.perf_counter() - t0:.1f}s")
+    written = store.flush()
+    store.close()
+    print(f"✅ {len(store.rows):,} reviewer profiles ({written:,} updated) in {args.db}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""Symbolic layer of the hybrid formula as a declarative rule table.
+
+Each rule is a condition over batch columns plus a score delta and the reason
+it contributes. The table is evaluated column-wise with NumPy for the whole
+batch; Python only runs once per rule, not once per review.
+"""
+from __future__ import annotations
+import re
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+Columns = Dict[str, np.ndarray]
+
+BASE_SCORE = 50
+
+# Semantic-layer bands over the ML score P(real)
+ML_GENERIC = 0.3
+ML_AUTHENTIC = 0.8
+
+# Near-duplicates of other reviews (see dedup_index.py) at which a text counts as a template campaign
+NEAR_DUP_MIN = 2
+# Reviews by one reviewer within a day (see reviewer_store.py) at which posting counts as a burst
+BURST_MIN = 3
+
+# "amazon customer" anywhere, user1234-style handles, or one long alnum token
+SUSPICIOUS_NAME = re.compile(r"amazon customer|^user\d{4,}|^[a-z0-9]{8,}$")
+
+
+class Rule(NamedTuple):
+    name: str
+    layer: str
+    when: Callable[[Columns], np.ndarray]
+    delta: int
+    icon: Optional[str] = None
+    text: Optional[str] = None
+
+
+class Clamp(NamedTuple):
+    """Caps the score at `max_score` wherever `when` holds."""
+    name: str
+    when: Callable[[Columns], np.ndarray]
+    max_score: int
+    icon: Optional[str] = None
+    text: Optional[str] = None
+
+
+# --- THE HYBRID FORMULA ---
+RULES: List[Rule] = [
+    # 1. METADATA LAYER
+    Rule("verified_purchase", "metadata", lambda c: c["verified"], +25, "✅", "Verified Purchase"),
+    Rule("has_media", "metadata", lambda c: c["images"] > 0, +15, "📸", "Media verified"),
+    # 2. SEMANTIC LAYER (The ML Score)
+    Rule("ml_authentic", "semantic", lambda c: c["ml"] > ML_AUTHENTIC, +15, "🧠", "Writing style analysis: Authentic"),
+    Rule("ml_generic", "semantic", lambda c: c["ml"] < ML_GENERIC, -25, "🤖", "Writing style analysis: Generic/AI"),
+    # 3. BEHAVIORAL LAYER (Username, reviewer profile, copied text)
+    Rule("suspicious_name", "behavioral", lambda c: c["suspicious_name"], -15),
+    Rule("review_burst", "behavioral", lambda c: c["burst"] >= BURST_MIN, -10,
+         "⏱️", "Posting burst: several reviews within a day"),
+    Rule("near_duplicate", "behavioral", lambda c: c["dup_count"] >= NEAR_DUP_MIN, -20,
+         "🧬", "Near-identical to other reviews (template campaign)"),
+]
+
+# 4. TRUST CEILING: IF Verified_Purchase == False -> Max_Score = 45
+CLAMPS: List[Clamp] = [
+    Clamp("trust_ceiling", lambda c: ~c["verified"], 45, "🛑", "Trust ceiling: purchase not verified"),
+]
+
+# (exclusive upper bound, label); scores >= the last bound fall through to "Highly Authentic"
+LABELS = [(40, "Likely Fake"), (60, "Low Confidence"), (90, "Feels Genuine")]
+TOP_LABEL = "Highly Authentic"
+
+
+def is_suspicious_name(name) -> bool:
+    if not name:
+        return True
+    return SUSPICIOUS_NAME.search(name.lower().strip()) is not None
+
+
+def ml_band(ml_scores) -> np.ndarray:
+    """Semantic rule each ML score triggers: 0 = generic (< ML_GENERIC), 1 = neither, 2 = authentic (> ML_AUTHENTIC)."""
+    s = np.asarray(ml_scores, dtype=np.float64)
+    return (s >= ML_GENERIC).astype(np.int8) + (s > ML_AUTHENTIC)
+
+
+def empty_profiles(n: int) -> Columns:
+    """Profile columns for reviewers with no history (or no reviewer store)."""
+    return {
+        "reviewer_reviews": np.zeros(n, dtype=np.int64),
+        "reviewer_verified_ratio": np.full(n, np.nan),
+        "reviewer_mean_rating": np.full(n, np.nan),
+        "reviewer_mean_length": np.full(n, np.nan),
+        "burst": np.zeros(n, dtype=np.int64),
+    }
+
+
+def build_columns(reviews: Sequence, ml_scores, dup_counts=None, profiles: Optional[Columns] = None) -> Columns:
+    """Columnar view of a batch of ReviewIn-like objects, plus reviewer profile columns."""
+    n = len(reviews)
+    if dup_counts is None:
+        dup_counts = np.zeros(n, dtype=np.int64)
+    columns = {
+        "verified": np.fromiter((bool(r.verified_purchase) for r in reviews), dtype=bool, count=n),
+        "images": np.fromiter((r.image_count or 0 for r in reviews), dtype=np.int32, count=n),
+        "ml": np.asarray(ml_scores, dtype=np.float64).reshape(n),
+        "suspicious_name": np.fromiter((is_suspicious_name(r.author_name) for r in reviews), dtype=bool, count=n),
+        "dup_count": np.asarray(dup_counts, dtype=np.int64).reshape(n),
+    }
+    columns.update(profiles if profiles is not None else empty_profiles(n))
+    return columns
+
+
+def describe_history(columns: Columns) -> List[str]:
+    """The "Reviewer History" line per review."""
+    out = []
+    for suspicious, reviews, burst, verified, rating in zip(
+        columns["suspicious_name"].tolist(),
+        columns["reviewer_reviews"].tolist(),
+        columns["burst"].tolist(),
+        columns["reviewer_verified_ratio"].tolist(),
+        columns["reviewer_mean_rating"].tolist(),
+    ):
+        if suspicious:
+            out.append("Suspicious Profile")
+        elif burst >= BURST_MIN:
+            out.append(f"Burst: {burst} reviews within a day")
+        elif reviews > 1:
+            parts = [f"{reviews} reviews"]
+            if verified == verified:
+                parts.append(f"{verified:.0%} verified")
+            if rating == rating:
+                parts.append(f"avg {rating:.1f}★")
+            out.append(" · ".join(parts))
+        else:
+            out.append("Standard Profile")
+    return out
+
+
+def evaluate(columns: Columns, rules: Sequence[Rule] = RULES, clamps: Sequence[Clamp] = CLAMPS) -> List[dict]:
+    n = len(columns["ml"])
+    score = np.full(n, BASE_SCORE, dtype=np.int64)
+    reasons: List[List[dict]] = [[] for _ in range(n)]
+
+    for rule in rules:
+        hit = np.asarray(rule.when(columns), dtype=bool)
+        score += rule.delta * hit
+        if rule.icon:
+            for i in np.flatnonzero(hit):
+                reasons[i].append({"icon": rule.icon, "text": rule.text})
+
+    for clamp in clamps:
+        hit = np.asarray(clamp.when(columns), dtype=bool) & (score > clamp.max_score)
+        score = np.where(hit, clamp.max_score, score)
+        if clamp.icon:
+            for i in np.flatnonzero(hit):
+                reasons[i].append({"icon": clamp.icon, "text": clamp.text})
+
+    score = np.clip(score, 0, 100)
+    bounds = np.array([b for b, _ in LABELS])
+    names = [label for _, label in LABELS] + [TOP_LABEL]
+    label_idx = np.searchsorted(bounds, score, side="right")
+    history = describe_history(columns)
+
+    return [
+        {"total": int(score[i]), "label": names[label_idx[i]], "reasons": reasons[i], "history": history[i]}
+        for i in range(n)
+    ]
+
+
+def score_reviews(reviews: Sequence, ml_scores, dup_counts=None, profiles: Optional[Columns] = None) -> List[dict]:
+    return evaluate(build_columns(reviews, ml_scores, dup_counts, profiles))
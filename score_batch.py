@@ -0,0 +1,175 @@
+"""Offline bulk scoring of stored reviews with the same pipeline as /score.
+
+Input is a JSON/NDJSON dump or a Parquet file produced by load_reviews.py.
+Rows are cut into fixed-size chunks and scored by a pool of worker processes,
+each loading the model once. Every chunk is written as its own Parquet part,
+so a crashed run resumes by skipping parts that already exist.
+
+Reviewer History and the burst rule read the same reviewer profiles as /score
+(--reviewers-db, read-only here); backfill them from the input first so every
+review's profile includes it, as it would after /score counted it:
+
+    python reviewer_store.py data/reviews.parquet
+    python score_batch.py data/reviews.parquet out/scores --workers 8
+
+Near-duplicate counts depend on the order reviews reach the live index, so they
+stay a /score-only signal.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import pathlib
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from load_reviews import iter_review_chunks
+
+JOB_FILE = "_job.json"
+
+_pipeline = None
+_reviewers = None
+
+
+def iter_input_chunks(path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from iter_review_chunks(path, chunk_size=chunk_size)
+
+
+def present(row: Dict[str, Any], key: str) -> bool:
+    v = row.get(key)
+    return v is not None and v == v  # NaN from Parquet nulls
+
+
+def to_review(row: Dict[str, Any]) -> SimpleNamespace:
+    """Map a load_reviews row onto the ReviewIn fields the pipeline reads."""
+    return SimpleNamespace(
+        review_id=str(row["review_id"]) if present(row, "review_id") else None,
+        review_title=str(row["review_title"]) if present(row, "review_title") else "",
+        review_body=str(row["review_text"]) if present(row, "review_text") else "",
+        verified_purchase=bool(row["verified_purchase"]) if present(row, "verified_purchase") else False,
+        image_count=int(bool(row["has_images"])) if present(row, "has_images") else 0,
+        author_name=str(row["author_name"]) if present(row, "author_name") else "Unknown",
+        reviewer_id=str(row["reviewer_id"]) if present(row, "reviewer_id") else None,
+        rating=float(row["rating"]) if present(row, "rating") else None,
+        review_date=str(row["review_date"]) if present(row, "review_date") else None,
+    )
+
+
+def _init_worker(model_source: Optional[str], threads: int, reviewers_db: Optional[str]) -> None:
+    global _pipeline, _reviewers
+    # Keep each worker to its share of the cores instead of every torch pool grabbing all of them
+    import torch
+    torch.set_num_threads(threads)
+    from pipeline import ScoringPipeline
+    _pipeline = ScoringPipeline.from_source(model_source)
+    if _pipeline is None:
+        raise RuntimeError(f"No usable model at {model_source or 'the default location'}")
+    if reviewers_db:
+        from reviewer_store import ReviewerStore
+        _reviewers = ReviewerStore(reviewers_db)
+
+
+def _score_chunk(index: int, rows: List[Dict[str, Any]], part_path: str) -> int:
+    from rules import score_reviews
+    from pipeline import review_text
+
+    reviews = [to_review(r) for r in rows]
+    ml = _pipeline.infer([review_text(r) for r in reviews])
+    profiles = None
+    if _reviewers is not None:
+        from reviewer_store import parse_review_date, reviewer_key
+        profiles = _reviewers.lookup(
+            [reviewer_key(r.reviewer_id, r.author_name) for r in reviews],
+            [parse_review_date(r.review_date) for r in reviews],
+        )
+    scores = score_reviews(reviews, ml, profiles=profiles)
+    out = pd.DataFrame({
+        "review_id": [str(r["review_id"]) if present(r, "review_id") else None for r in rows],
+        "total": [s["total"] for s in scores],
+        "label": [s["label"] for s in scores],
+        "reasons": [json.dumps(s["reasons"], ensure_ascii=False) for s in scores],
+        "history": [s["history"] for s in scores],
+        "ml_score": ml.astype(float),
+    })
+    # Write then rename, so a part file on disk is always complete
+    tmp = part_path + ".tmp"
+    out.to_parquet(tmp, index=False)
+    os.replace(tmp, part_path)
+    return len(out)
+
+
+def run(args) -> None:
+    out_dir = pathlib.Path(args.out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    reviewers_db = os.path.abspath(args.reviewers_db) if args.reviewers_db else None
+    if reviewers_db and not os.path.exists(reviewers_db):
+        print(f"⚠️ No reviewer profiles at {reviewers_db}; every review gets an empty history")
+        reviewers_db = None
+    job = {"input": os.path.abspath(args.input), "chunk_size": args.chunk_size, "reviewers_db": reviewers_db}
+    job_path = out_dir / JOB_FILE
+    if job_path.exists():
+        previous = json.loads(job_path.read_text())
+        if previous != job:
+            raise SystemExit(f"❌ {out_dir} holds a different job ({previous}); use a fresh output dir.")
+    job_path.write_text(json.dumps(job))
+
+    threads = max(1, (os.cpu_count() or 1) // args.workers)
+    ctx = get_context("spawn")
+    done = skipped = 0
+    t0 = time.perf_counter()
+    last_report = t0
+    pending = set()
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=ctx,
+        initializer=_init_worker,
+        initargs=(args.model, threads, reviewers_db),
+    ) as pool:
+        for index, df in enumerate(iter_input_chunks(args.input, args.chunk_size)):
+            part = out_dir / f"part-{index:06d}.parquet"
+            if part.exists():
+                skipped += 1
+                continue
+            # Bound the number of chunks in flight so the reader never runs ahead of the workers
+            while len(pending) >= 2 * args.workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                done += sum(f.result() for f in finished)
+            pending.add(pool.submit(_score_chunk, index, df.to_dict("records"), str(part)))
+
+            now = time.perf_counter()
+            if now - last_report > 10:
+                print(f"   ⏱️ {done:,} reviews scored, {done / (now - t0):,.0f} reviews/s")
+                last_report = now
+        for f in pending:
+            done += f.result()
+
+    elapsed = time.perf_counter() - t0
+    print(f"✅ Scored {done:,} reviews in {elapsed:.1f}s ({done / max(elapsed, 1e-9):,.0f} reviews/s); "
+          f"{skipped} chunks already done")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bulk-score stored reviews into Parquet.")
+    ap.add_argument("input", help="JSON/NDJSON dump or Parquet from load_reviews.py")
+    ap.add_argument("out_dir", help="Directory for part-*.parquet results")
+    ap.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    ap.add_argument("--chunk-size", type=int, default=2048)
+    ap.add_argument("--model", help="models root, model version dir or legacy .pkl (default: models/ or arc_model.pkl)")
+    ap.add_argument("--reviewers-db", default=os.path.join("reviewers", "reviewers.sqlite"),
+                    help="reviewer profiles shared with the API (empty: score without reviewer history)")
+    run(ap.parse_args())
+
+
+if __name__ == "__main__":
+    main()
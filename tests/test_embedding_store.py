@@ -0,0 +1,28 @@
+import numpy as np
+
+from embedding_cache import KEY_BYTES
+from embedding_store import EmbeddingStore
+
+
+def _nul_terminated_text(store):
+    # ~1 in 256 text keys ends in a NUL byte, which S16 arrays drop on read
+    for i in range(10_000):
+        text = f"review {i}"
+        if store.keys_for([text])[0].endswith(b"\x00"):
+            return text
+    raise AssertionError("no NUL-terminated key found")
+
+
+def test_key_ending_in_nul_survives_reload(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "enc")
+    text = _nul_terminated_text(store)
+    assert len(store.keys_for([text])[0]) == KEY_BYTES
+    vec = np.arange(4, dtype=np.float32)[None]
+    store.add([text], vec)
+
+    reloaded = EmbeddingStore(str(tmp_path), "enc")
+    assert reloaded.missing([text]) == []
+    np.testing.assert_array_equal(reloaded.get([text]), vec)
+    calls = []
+    reloaded.encode([text], lambda texts: calls.append(texts) or np.zeros((len(texts), 4), np.float32))
+    assert calls == []
@@ -1,15 +1,21 @@
+import argparse
 import pandas as pd
-import json
 import pickle
 import random
 import os
-import ast
+import time
 import numpy as np
 # Use Scikit-Learn GradientBoosting (Native & Reliable)
 from sklearn.ensemble import GradientBoostingClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report
-from sentence_transformers import SentenceTransformer
+from tree_predictor import CompiledGBC
+from cascade import FirstStage, TARGET_AGREEMENT
+from bucketed_encoder import BucketedEncoder, MAX_TOKENS, TOKEN_BUDGET, TRUNCATION_SIDE
+from projection import Projector, METHODS, DTYPES, DEFAULT_DIM
+from ingest import ingest_files
+from embedding_store import EmbeddingStore, DATASET_FILE
+from artifacts import write_artifact
 
 # --- CONFIG ---
 # List all your dataset files here
@@ -22,67 +28,33 @@ DATASET_FILES = [
     "Handmade_Products.jsonl"
 ]
 
+ENCODER_NAME = "all-MiniLM-L6-v2"
+
 MODEL_OUTPUT = "arc_model.pkl"
+# Memory-mapped embedding shards reused across training runs
+EMBEDDING_STORE_DIR = "embedding_store"
+# Flattened tree arrays served by app.py instead of the pickled sklearn estimator
+COMPILED_OUTPUT = "arc_trees"
+# Versioned artifacts (models/<version>/ + models/CURRENT) loaded by app.py
+MODELS_DIR = "models"
 
 # 20,000 per file * 5 files = 100,000 training rows (Heavy Usage - Reducing it for laptop)
 SAMPLE_SIZE_PER_FILE = 20000 
 
-# --- LOAD DATA ---
-def load_data():
-    real_detailed = []
-    real_short = []
-    
-    print(f"🚀 Starting Multi-File Ingestion...")
-    
-    for filename in DATASET_FILES:
-        filepath = os.path.abspath(filename)
-        
-        if not os.path.exists(filepath):
-            print(f"   ⚠️ File not found: {filename} (Skipping)")
-            continue
+# Processes used to parse the dumps (None = all cores)
+INGEST_WORKERS = None
 
-        print(f"   📂 Scanning {filename}...")
-        count = 0
-        with open(filepath, 'r') as f:
-            for i, line in enumerate(f):
-                # Stop if we have enough from this category
-                if count >= SAMPLE_SIZE_PER_FILE: break
-                
-                try: row = json.loads(line)
-                except: 
-                    try: row = ast.literal_eval(line)
-                    except: continue
-
-                if row:
-                    text = row.get("reviewText") or row.get("text") or row.get("body") or ""
-                    text_len = len(str(text))
-                    
-                    # Smart Filtering: Only keep useful data
-                    # 1. Detailed Real Reviews (High Trust Anchors)
-                    if text_len > 150:
-                        real_detailed.append({"text": str(text), "label": 1})
-                        count += 1
-                    # 2. Short but SPECIFIC Real Reviews (Hard Negatives)
-                    elif text_len < 80 and text_len > 15:
-                        real_short.append({"text": str(text), "label": 1})
-                        count += 1
-        print(f"      -> Added {count} reviews.")
-    
-    total_real = len(real_detailed) + len(real_short)
-    print(f"✅ TOTAL REAL DATA: {total_real} reviews across {len(DATASET_FILES)} categories.")
-    
-    if total_real == 0:
-        print("❌ CRITICAL ERROR: No data loaded. Check your filenames!")
-        return pd.DataFrame()
+# Embedding compression for the served model (see projection.py); "none" + "float32" keeps full precision
+PROJECTION_METHOD = "none"
+PROJECTION_DIM = DEFAULT_DIM
+PROJECTION_DTYPE = "float32"
 
-    # --- ADVERSARIAL DATA AUGMENTATION ---
-    # We must balance the dataset with an equal number of Fakes
-    print(f"🤖 Generating {total_real} adversarial fakes (AI + Spam)...")
-    
-    generic_templates = ["Good.", "Nice.", "I like it.", "Fast shipping.", "Five stars.", "Ok item.", "Decent quality."]
-    
-    # "Hallucinated" AI Fakes (High Perplexity, Low Information)
-    ai_templates = [
+# --- ADVERSARIAL TEMPLATES ---
+# Short generic spam
+GENERIC_TEMPLATES = ["Good.", "Nice.", "I like it.", "Fast shipping.", "Five stars.", "Ok item.", "Decent quality."]
+
+# "Hallucinated" AI Fakes (High Perplexity, Low Information)
+AI_TEMPLATES = [
     # 20 GENERIC HALLUCINATED TEMPLATES
     "This product exceeded my expectations in every possible way, and I truly think everyone should try it.",
     "The quality feels premium, and I’m honestly surprised by how well it performs for the price.",
@@ -189,17 +161,48 @@ def load_data():
     "Every feature behaves predictably, which makes the entire experience feel intuitive and reliable."
 ]
 
-    fake_data = []
+def make_fake_text(rng=random):
+    if rng.random() > 0.6:
+        # 60% Generic Spam (Short)
+        return rng.choice(GENERIC_TEMPLATES) + " " + rng.choice(GENERIC_TEMPLATES)
+    # 40% AI Hallucinations (Long)
+    return rng.choice(AI_TEMPLATES) + " " + rng.choice(AI_TEMPLATES)
+
+# --- LOAD DATA ---
+def load_data():
+    real_detailed = []
+    real_short = []
+    
+    print(f"🚀 Starting Multi-File Ingestion...")
+
+    paths = []
+    for filename in DATASET_FILES:
+        filepath = os.path.abspath(filename)
+        if not os.path.exists(filepath):
+            print(f"   ⚠️ File not found: {filename} (Skipping)")
+            continue
+        paths.append(filepath)
+
+    # Parallel byte-range scan; each file contributes a uniform sample, not its head
+    sampled = ingest_files(paths, SAMPLE_SIZE_PER_FILE, workers=INGEST_WORKERS) if paths else {}
+    for filepath, res in sampled.items():
+        real_detailed += [{"text": t, "label": 1} for t in res["detailed"]]
+        real_short += [{"text": t, "label": 1} for t in res["short"]]
+        print(f"   📂 {os.path.basename(filepath)}: sampled {len(res['detailed']) + len(res['short'])} "
+              f"of {res['matched']} matching reviews ({res['lines']} lines)")
     
-    for _ in range(total_real):
-        if random.random() > 0.6:
-            # 60% Generic Spam (Short)
-            fake_text = random.choice(generic_templates) + " " + random.choice(generic_templates)
-        else:
-            # 40% AI Hallucinations (Long)
-            fake_text = random.choice(ai_templates) + " " + random.choice(ai_templates)
-        
-        fake_data.append({"text": fake_text, "label": 0})
+    total_real = len(real_detailed) + len(real_short)
+    print(f"✅ TOTAL REAL DATA: {total_real} reviews across {len(DATASET_FILES)} categories.")
+    
+    if total_real == 0:
+        print("❌ CRITICAL ERROR: No data loaded. Check your filenames!")
+        return pd.DataFrame()
+
+    # --- ADVERSARIAL DATA AUGMENTATION ---
+    # We must balance the dataset with an equal number of Fakes
+    print(f"🤖 Generating {total_real} adversarial fakes (AI + Spam)...")
+    
+    fake_data = [{"text": make_fake_text(), "label": 0} for _ in range(total_real)]
 
     # Combine
     all_data = real_detailed + real_short + fake_data
@@ -210,33 +213,98 @@ def load_data():
     
     return pd.DataFrame(all_data)
 
+def make_classifier():
+    # High Complexity configuration for demonstration
+    return GradientBoostingClassifier(
+        n_estimators=500,     # High number of trees = "Heavy" training
+        learning_rate=0.05,   # Slow learning = High Precision
+        max_depth=8,          # Deep trees = Captures complex non-linear patterns
+        verbose=1
+    )
+
 if __name__ == "__main__":
-    df = load_data()
+    parser = argparse.ArgumentParser(description="Train the ARC hybrid model.")
+    parser.add_argument("--from-store", action="store_true",
+                        help="Skip ingestion and encoding; retrain from the last dataset snapshot and stored embeddings")
+    parser.add_argument("--store", default=EMBEDDING_STORE_DIR, help="Embedding store directory")
+    parser.add_argument("--projection", choices=METHODS, default=PROJECTION_METHOD,
+                        help="Reduce embeddings before the classifier: PCA, Gaussian random projection or none")
+    parser.add_argument("--dim", type=int, default=PROJECTION_DIM, help="Features kept by --projection")
+    parser.add_argument("--quantize", choices=DTYPES, default=PROJECTION_DTYPE,
+                        help="Storage precision of the (projected) embeddings in the caches")
+    args = parser.parse_args()
+
+    # Truncation changes long-text embeddings, so it is part of the store's encoder identity
+    store = EmbeddingStore(args.store, f"{ENCODER_NAME}:max{MAX_TOKENS}:{TRUNCATION_SIDE}")
+    snapshot = os.path.join(args.store, DATASET_FILE)
+
+    if args.from_store:
+        if not os.path.exists(snapshot):
+            raise SystemExit(f"❌ No dataset snapshot at {snapshot}; run once without --from-store first.")
+        df = pd.read_parquet(snapshot)
+        print(f"💽 Loaded dataset snapshot with {len(df)} reviews from {snapshot}")
+    else:
+        df = load_data()
+        if not df.empty:
+            df.to_parquet(snapshot, index=False)
     
     if not df.empty:
-        print(f"🧠 Encoding {len(df)} reviews using Transformer [all-MiniLM-L6-v2]...")
+        print(f"🧠 Encoding {len(df)} reviews using Transformer [{ENCODER_NAME}]...")
         print("   (This captures semantic meaning rather than just keywords)")
         
-        # 1. Load Transformer
-        encoder = SentenceTransformer('all-MiniLM-L6-v2')
+        # 1. Load Transformer (imported here so the templates above stay cheap to import)
+        from sentence_transformers import SentenceTransformer
+        encoder = SentenceTransformer(ENCODER_NAME)
+        batch_encoder = BucketedEncoder(encoder, MAX_TOKENS, TOKEN_BUDGET, TRUNCATION_SIDE)
         
-        # 2. Vectorize (Heavy Compute Step)
-        embeddings = encoder.encode(df['text'].tolist(), show_progress_bar=True)
+        # 2. Vectorize (Heavy Compute Step) - only texts not already in the store,
+        # in length-sorted batches under a padded-token budget (same path as serving)
+        embeddings = store.encode(
+            df['text'].tolist(),
+            lambda texts: batch_encoder.encode(texts, show_progress=True),
+        )
         
         # 3. Train Ensemble Classifier
         print("🔥 Training Deep Gradient Boosting Classifier (500 Estimators)...")
-        X_train, X_test, y_train, y_test = train_test_split(embeddings, df['label'], test_size=0.2)
+        # Split row indices so the cascade first stage below trains on the same texts
+        idx_train, idx_test = train_test_split(np.arange(len(df)), test_size=0.2)
+        labels = df['label'].to_numpy()
+        X_train, X_test = embeddings[idx_train], embeddings[idx_test]
+        y_train, y_test = labels[idx_train], labels[idx_test]
         
-        # High Complexity configuration for demonstration
-        classifier = GradientBoostingClassifier(
-            n_estimators=500,     # High number of trees = "Heavy" training
-            learning_rate=0.05,   # Slow learning = High Precision
-            max_depth=8,          # Deep trees = Captures complex non-linear patterns
-            verbose=1
-        )
+        classifier = make_classifier()
+        t0 = time.perf_counter()
         classifier.fit(X_train, y_train)
+        baseline_fit_s = time.perf_counter() - t0
         
         print("📊 Evaluation Results:\n", classification_report(y_test, classifier.predict(X_test)))
+        baseline_accuracy = float((classifier.predict(X_test) == y_test).mean())
+
+        # 3b. Optional compression: the served classifier is trained on projected/quantized features.
+        # arc_model.pkl and arc_trees/ below stay full precision; only the versioned artifact is compressed.
+        projector, served, F_test, compression = None, classifier, X_test, None
+        if args.projection != "none" or args.quantize != "float32":
+            projector = Projector.fit(X_train, args.projection, args.dim, args.quantize)
+            print(f"🗜️ Training on compressed embeddings ({args.projection} to {projector.dim} dims, "
+                  f"{args.quantize}: {projector.bytes_per_vector} vs {X_train.shape[1] * 4} bytes per review)...")
+            served = make_classifier()
+            t0 = time.perf_counter()
+            served.fit(projector.transform(X_train), y_train)
+            compressed_fit_s = time.perf_counter() - t0
+            F_test = projector.transform(X_test)
+            print("📊 Compressed Evaluation Results:\n", classification_report(y_test, served.predict(F_test)))
+            compression = dict(projector.meta,
+                               bytes_per_vector=projector.bytes_per_vector,
+                               baseline_bytes_per_vector=int(X_train.shape[1] * 4),
+                               accuracy=float((served.predict(F_test) == y_test).mean()),
+                               baseline_accuracy=baseline_accuracy,
+                               fit_seconds=compressed_fit_s,
+                               baseline_fit_seconds=baseline_fit_s)
+            print(f"   Accuracy {compression['accuracy']:.4f} vs {baseline_accuracy:.4f} full precision "
+                  f"({compression['accuracy'] - baseline_accuracy:+.4f}); "
+                  f"fit {compressed_fit_s:.0f}s vs {baseline_fit_s:.0f}s"
+                  + (f"; PCA keeps {projector.meta['explained_variance']:.1%} of the variance"
+                     if "explained_variance" in projector.meta else ""))
         
         # 4. Save Hybrid Model Bundle
         model_bundle = {
@@ -247,3 +315,43 @@ if __name__ == "__main__":
         with open(MODEL_OUTPUT, 'wb') as f:
             pickle.dump(model_bundle, f)
         print(f"💾 Neuro-Symbolic Model saved to {MODEL_OUTPUT}")
+
+        # 5. Export array-backed predictor and check it against sklearn
+        compiled = CompiledGBC.from_sklearn(classifier)
+        max_diff = np.abs(compiled.predict_proba(X_test) - classifier.predict_proba(X_test)).max()
+        served_compiled = compiled
+        if served is not classifier:
+            served_compiled = CompiledGBC.from_sklearn(served)
+            max_diff = max(max_diff, np.abs(served_compiled.predict_proba(F_test) - served.predict_proba(F_test)).max())
+        if max_diff > 1e-6:
+            print(f"❌ Compiled trees disagree with sklearn (max diff {max_diff:.2e}), not exporting")
+        else:
+            compiled.save(COMPILED_OUTPUT)
+            print(f"⚡ Compiled {len(compiled.roots)} trees saved to {COMPILED_OUTPUT}/ (max diff {max_diff:.2e})")
+
+            # 6. Cascade first stage: hashed n-grams + linear model on the same training texts.
+            # Band edges are tuned against the full model on half the test split and checked on the other half.
+            print("🪜 Training cascade first stage (hashed char/word n-grams)...")
+            texts = df['text'].to_numpy(dtype=object)
+            first_stage = FirstStage.fit(list(texts[idx_train]), y_train)
+            stage_scores = first_stage.predict_proba(list(texts[idx_test]))
+            full_scores = served_compiled.predict_proba(F_test)[:, 1]
+            tune_rows, check_rows = np.array_split(np.random.permutation(len(idx_test)), 2)
+            low, high = first_stage.tune(stage_scores[tune_rows], full_scores[tune_rows], TARGET_AGREEMENT)
+            cascade_report = first_stage.report(stage_scores[check_rows], full_scores[check_rows])
+            print(f"   Uncertain band {low:.3f}..{high:.3f}: "
+                  f"{cascade_report['first_stage_share']:.1%} settled by the first stage, "
+                  f"{cascade_report['full_model_share']:.1%} sent to the transformer, "
+                  f"{cascade_report['agreement']:.2%} in the same rule band as the full model")
+
+            # 7. Versioned artifact: native encoder weights + .npy trees + manifest (what app.py serves)
+            version_dir = write_artifact(MODELS_DIR, encoder, served_compiled, metadata={
+                "encoder_name": ENCODER_NAME,
+                "n_train": int(len(X_train)),
+                "test_accuracy": float((served.predict(F_test) == y_test).mean()),
+                "compiled_max_diff": float(max_diff),
+                "cascade": dict(cascade_report, low=low, high=high, target_agreement=TARGET_AGREEMENT),
+                "encoding": {"max_tokens": MAX_TOKENS, "truncation_side": TRUNCATION_SIDE},
+                "compression": compression,
+            }, first_stage=first_stage, projector=projector)
+            print(f"📦 Model artifact written to {version_dir} (now CURRENT)")
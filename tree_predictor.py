@@ -0,0 +1,131 @@
+"""Array-backed predictor for the fitted GradientBoostingClassifier.
+
+`export_gbc` flattens every regression tree of a binary sklearn
+GradientBoostingClassifier into a handful of contiguous NumPy arrays, and
+`CompiledGBC` walks all trees for a whole batch at once. The arrays are saved as
+plain .npy files so serving can memory-map them instead of unpickling sklearn
+objects.
+"""
+from __future__ import annotations
+import json
+import os
+from typing import Dict, Optional
+
+import numpy as np
+
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "value", "roots")
+
+
+def export_gbc(classifier) -> Dict[str, np.ndarray]:
+    """Flatten a fitted binary GradientBoostingClassifier into node arrays."""
+    if classifier.estimators_.shape[1] != 1:
+        raise ValueError("Only binary GradientBoostingClassifier models can be compiled.")
+
+    trees = [est.tree_ for est in classifier.estimators_[:, 0]]
+    sizes = np.array([t.node_count for t in trees])
+    roots = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+    total = int(sizes.sum())
+
+    feature = np.zeros(total, dtype=np.int32)
+    threshold = np.zeros(total, dtype=np.float64)
+    left = np.zeros(total, dtype=np.int32)
+    right = np.zeros(total, dtype=np.int32)
+    value = np.zeros(total, dtype=np.float64)
+
+    for t, root in zip(trees, roots):
+        n = t.node_count
+        sl = slice(root, root + n)
+        is_leaf = t.children_left == -1
+        own = np.arange(n, dtype=np.int32) + root
+        # Leaves point back at themselves so every row can take the same number of steps
+        left[sl] = np.where(is_leaf, own, t.children_left + root)
+        right[sl] = np.where(is_leaf, own, t.children_right + root)
+        feature[sl] = np.where(is_leaf, 0, t.feature)
+        threshold[sl] = np.where(is_leaf, np.inf, t.threshold)
+        value[sl] = t.value[:, 0, 0]
+
+    n_features = int(classifier.n_features_in_)
+    init = float(classifier._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0, 0])
+    meta = {
+        "n_features": n_features,
+        "n_trees": len(trees),
+        "max_depth": int(max(t.max_depth for t in trees)),
+        "learning_rate": float(classifier.learning_rate),
+        "init": init,
+    }
+    return {
+        "feature": feature,
+        "threshold": threshold,
+        "left": left,
+        "right": right,
+        "value": value,
+        "roots": roots,
+        "meta": meta,
+    }
+
+
+class CompiledGBC:
+    """Vectorized drop-in for `GradientBoostingClassifier.predict_proba`."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], chunk_rows: int = 2048):
+        meta = arrays["meta"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.n_features_in_ = meta["n_features"]
+        self.max_depth = meta["max_depth"]
+        self.learning_rate = meta["learning_rate"]
+        self.init = meta["init"]
+        self.classes_ = np.array([0, 1])
+        self.chunk_rows = chunk_rows
+
+    @classmethod
+    def from_sklearn(cls, classifier) -> "CompiledGBC":
+        return cls(export_gbc(classifier))
+
+    def save(self, path: str) -> str:
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(path, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({
+                "n_features": self.n_features_in_,
+                "n_trees": int(len(self.roots)),
+                "max_depth": self.max_depth,
+                "learning_rate": self.learning_rate,
+                "init": self.init,
+            }, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path: str, mmap_mode: Optional[str] = "r") -> "CompiledGBC":
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+        with open(os.path.join(path, "meta.json")) as f:
+            arrays["meta"] = json.load(f)
+        return cls(arrays)
+
+    def decision_function(self, X) -> np.ndarray:
+        # sklearn compares float32 features against float64 thresholds; do the same
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(len(X), dtype=np.float64)
+        for start in range(0, len(X), self.chunk_rows):
+            out[start:start + self.chunk_rows] = self._raw(X[start:start + self.chunk_rows])
+        return out
+
+    def _raw(self, X: np.ndarray) -> np.ndarray:
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), len(self.roots)))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return self.init + self.learning_rate * self.value[nodes].sum(axis=1)
+
+    def predict_proba(self, X) -> np.ndarray:
+        p = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1.0 - p, p])
+
+    def predict(self, X) -> np.ndarray:
+        return (self.decision_function(X) > 0).astype(int)
@@ -0,0 +1,224 @@
+"""Multi-process inference pool that shares one loaded model copy-on-write.
+
+The API process loads the model once and then forks a fixed number of
+inference workers, so the encoder weights and tree arrays are shared pages
+rather than one copy per worker. Batches travel over a pipe per worker; each
+worker pins its torch intra-op threads (and optionally its CPUs) so workers
+don't fight each other or the API threads. A supervisor thread restarts any
+worker that dies and fails the batches it was holding. Every reply carries the
+metrics the worker recorded for that batch plus its embedding cache counters,
+so the API process can export them.
+
+Only the `fork` start method gives the copy-on-write sharing, so this is a
+Linux/macOS serving mode. Run a single uvicorn process in front of it.
+"""
+from __future__ import annotations
+import itertools
+import multiprocessing as mp
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+import metrics
+
+WORKER_RESTARTS = metrics.REGISTRY.register(metrics.Counter(
+    "arc_pool_worker_restarts_total", "Inference workers restarted after exiting unexpectedly."))
+
+
+# Embedding cache stats that only grow; a restarted worker's totals are carried over
+CACHE_COUNTERS = ("hits", "disk_hits", "misses")
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker holding a batch died before answering."""
+
+
+def _worker_main(conn, infer_fn: Callable[[List[str]], np.ndarray], threads: int, cpus: Optional[Sequence[int]],
+                 slot: int, on_start: Optional[Callable[[int], None]], on_exit: Optional[Callable[[], None]],
+                 cache_stats: Optional[Callable[[], Dict]]):
+    # Ctrl-C goes to the whole process group; let the API process drive shutdown
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # The parent's counts came along with the fork; only report what this worker records
+    metrics.REGISTRY.reset()
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    if on_start is not None:
+        on_start(slot)
+    try:
+        while True:
+            try:
+                msg = conn.recv()
+            except EOFError:
+                return
+            if msg is None:
+                return
+            req_id, texts = msg
+            try:
+                ok, payload = True, np.asarray(infer_fn(texts))
+            except Exception as e:
+                ok, payload = False, f"{type(e).__name__}: {e}"
+            report = (metrics.REGISTRY.take_deltas(), cache_stats() if cache_stats is not None else None)
+            conn.send((req_id, ok, payload, report))
+    finally:
+        if on_exit is not None:
+            on_exit()
+
+
+class _Worker:
+    def __init__(self, slot: int):
+        self.slot = slot
+        self.proc = None
+        self.conn = None
+        self.send_lock = threading.Lock()
+        self.inflight: Dict[int, Future] = {}
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        infer_fn: Callable[[List[str]], np.ndarray],
+        n_workers: int,
+        threads_per_worker: int = 1,
+        pin_cpus: bool = False,
+        on_start: Optional[Callable[[int], None]] = None,
+        on_exit: Optional[Callable[[], None]] = None,
+        cache_stats: Optional[Callable[[], Dict]] = None,
+    ):
+        """`on_start(slot)` runs in each worker right after the fork, `on_exit()` when it shuts down cleanly;
+        `cache_stats()` runs in the worker after every batch and is summed over workers by `cache_stats()`."""
+        self.infer_fn = infer_fn
+        self.on_start = on_start
+        self.on_exit = on_exit
+        self.cache_stats_fn = cache_stats
+        self._cache_stats: Dict[int, Dict] = {}
+        self._cache_retired = {k: 0 for k in CACHE_COUNTERS}
+        self.n_workers = n_workers
+        self.threads_per_worker = threads_per_worker
+        self.pin_cpus = pin_cpus
+        self._ctx = mp.get_context("fork")
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.workers = [_Worker(i) for i in range(n_workers)]
+        for w in self.workers:
+            self._start(w)
+        self._supervisor = threading.Thread(target=self._supervise, name="arc-pool-supervisor", daemon=True)
+        self._supervisor.start()
+
+    def _cpus_for(self, slot: int) -> Optional[List[int]]:
+        if not self.pin_cpus or not hasattr(os, "sched_getaffinity"):
+            return None
+        cpus = sorted(os.sched_getaffinity(0))
+        per = max(1, len(cpus) // self.n_workers)
+        return cpus[slot * per:(slot + 1) * per] or None
+
+    def _start(self, w: _Worker) -> None:
+        parent_conn, child_conn = self._ctx.Pipe()
+        proc = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.infer_fn, self.threads_per_worker, self._cpus_for(w.slot),
+                  w.slot, self.on_start, self.on_exit, self.cache_stats_fn),
+            name=f"arc-infer-{w.slot}",
+            daemon=True,
+        )
+        proc.start()
+        child_conn.close()
+        w.proc, w.conn = proc, parent_conn
+        threading.Thread(target=self._read, args=(w, parent_conn), name=f"arc-pool-reader-{w.slot}", daemon=True).start()
+
+    def _read(self, w: _Worker, conn) -> None:
+        while True:
+            try:
+                req_id, ok, payload, (deltas, cache_stats) = conn.recv()
+            except (EOFError, OSError):
+                return
+            metrics.REGISTRY.merge(deltas)
+            with self._lock:
+                if cache_stats is not None:
+                    self._cache_stats[w.slot] = cache_stats
+                fut = w.inflight.pop(req_id, None)
+            if fut is None:
+                continue
+            if ok:
+                fut.set_result(payload)
+            else:
+                fut.set_exception(RuntimeError(payload))
+
+    def _fail_inflight(self, w: _Worker, reason: str) -> None:
+        with self._lock:
+            pending, w.inflight = w.inflight, {}
+        for fut in pending.values():
+            fut.set_exception(WorkerCrashed(reason))
+
+    def _supervise(self) -> None:
+        while not self._stopped.wait(0.5):
+            for w in self.workers:
+                if w.proc.is_alive():
+                    continue
+                code = w.proc.exitcode
+                print(f"⚠️ Inference worker {w.slot} exited ({code}); restarting")
+                w.conn.close()
+                self._fail_inflight(w, f"inference worker {w.slot} exited with {code}")
+                with self._lock:
+                    last = self._cache_stats.pop(w.slot, {})
+                    for k in CACHE_COUNTERS:
+                        self._cache_retired[k] += last.get(k, 0)
+                WORKER_RESTARTS.inc()
+                self._start(w)
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        fut: Future = Future()
+        req_id = next(self._ids)
+        with self._lock:
+            # Least in-flight batches first
+            w = min(self.workers, key=lambda x: len(x.inflight))
+            w.inflight[req_id] = fut
+        try:
+            with w.send_lock:
+                w.conn.send((req_id, list(texts)))
+        except (OSError, ValueError) as e:
+            with self._lock:
+                w.inflight.pop(req_id, None)
+            fut.set_exception(WorkerCrashed(str(e)))
+        return fut
+
+    def cache_stats(self) -> Dict[str, float]:
+        """Embedding cache stats summed over the workers, in the shape of EmbeddingCache.stats()."""
+        with self._lock:
+            per_worker = list(self._cache_stats.values())
+            total = dict(self._cache_retired, entries=0, disk_entries=0)
+        for st in per_worker:
+            for k in CACHE_COUNTERS + ("entries", "disk_entries"):
+                total[k] += st.get(k, 0)
+        lookups = total["hits"] + total["misses"]
+        total["hit_rate"] = total["hits"] / lookups if lookups else 0.0
+        return total
+
+    def infer(self, texts: List[str]) -> np.ndarray:
+        """Blocking call with the same signature as ScoringPipeline.infer."""
+        return self.submit(texts).result()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopped.set()
+        for w in self.workers:
+            try:
+                with w.send_lock:
+                    w.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        deadline = time.monotonic() + timeout
+        for w in self.workers:
+            w.proc.join(max(0.0, deadline - time.monotonic()))
+            if w.proc.is_alive():
+                w.proc.terminate()
+            self._fail_inflight(w, "pool stopped")